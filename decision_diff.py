@@ -0,0 +1,170 @@
+"""Where do two strategies decide differently on the same recorded frames?
+
+Both strategies are replayed (replay.replay_actions) on every frame of the
+given recordings, and each controlled player's decision in each frame is put
+in a bucket by the player's role, the game mode, who owns the ball and the
+field zone the player stands in. The report gives the disagreement rate per
+bucket, per dimension and for the worst combined buckets, with sample frames
+to replay. Recordings are handled in parallel, one per worker process.
+
+    python decision_diff.py trajectories/*.npz --a roles_6_10 --b roles_6_11
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from recorder import Trajectory
+from replay import replay_actions
+from strategies.profiling import GAME_MODE_NAMES, ROLE_NAMES
+
+OWNERSHIP_NAMES = ('player', 'teammate', 'opponent', 'loose')  # who has the ball, seen from the deciding player
+ZONE_NAMES = ('defence', 'midfield', 'attack')  # thirds of the pitch along x, we attack towards x = 1
+DIMENSIONS = (('role', ROLE_NAMES), ('game_mode', GAME_MODE_NAMES),
+              ('ball', OWNERSHIP_NAMES), ('zone', ZONE_NAMES))
+NUM_BUCKETS = int(np.prod([len(names) for _, names in DIMENSIONS]))
+
+
+def bucket_codes(trajectory):
+    """(steps, num_agents) combined bucket code of every decision in a recording."""
+    columns = trajectory.columns
+    steps = np.arange(len(trajectory))[:, np.newaxis]
+    player = columns['active']
+    role = np.clip(columns['left_team_roles'][steps, player], 0, len(ROLE_NAMES) - 1)
+    game_mode = np.clip(columns['game_mode'], 0, len(GAME_MODE_NAMES) - 1)[:, np.newaxis]
+    owned_team = columns['ball_owned_team'][:, np.newaxis]
+    ball = np.select(
+        [(owned_team == 0) & (columns['ball_owned_player'][:, np.newaxis] == player), owned_team == 0, owned_team == 1],
+        [0, 1, 2], default=3,
+    )
+    zone = np.digitize(columns['left_team'][steps, player, 0], (-1 / 3, 1 / 3))
+    code = role
+    for dimension, (_, names) in zip((game_mode, ball, zone), DIMENSIONS[1:]):
+        code = code * len(names) + dimension
+    return code
+
+
+def bucket_labels(code):
+    labels = {}
+    for name, names in reversed(DIMENSIONS):
+        code, index = divmod(code, len(names))
+        labels[name] = names[index]
+    return dict(reversed(labels.items()))
+
+
+def diff_file(path, strategy_a, strategy_b, batch_size=None, max_samples=3):
+    """Decision and disagreement counts per bucket for one recording, plus sample disagreements."""
+    trajectory = Trajectory.load(path)
+    if not len(trajectory):
+        return {'decisions': np.zeros(NUM_BUCKETS, np.int64), 'disagreements': np.zeros(NUM_BUCKETS, np.int64),
+                'samples': {}}
+    actions_a = replay_actions(trajectory, strategy_a, batch_size)
+    actions_b = replay_actions(trajectory, strategy_b, batch_size)
+    codes = bucket_codes(trajectory)
+    differ = actions_a != actions_b
+    samples = {}
+    for step, agent in zip(*np.nonzero(differ)):
+        bucket = samples.setdefault(int(codes[step, agent]), [])
+        if len(bucket) < max_samples:
+            player = int(trajectory.columns['active'][step, agent])
+            bucket.append({
+                'path': path,
+                'step': int(step),
+                'agent': int(agent),
+                'player': player,
+                'action_a': int(actions_a[step, agent]),
+                'action_b': int(actions_b[step, agent]),
+                'position': trajectory.columns['left_team'][step, player].round(3).tolist(),
+                'ball': trajectory.columns['ball'][step].round(3).tolist(),
+            })
+    return {
+        'decisions': np.bincount(codes.ravel(), minlength=NUM_BUCKETS),
+        'disagreements': np.bincount(codes[differ], minlength=NUM_BUCKETS),
+        'samples': samples,
+    }
+
+
+def merge(parts, max_samples=3):
+    merged = {'decisions': np.zeros(NUM_BUCKETS, np.int64), 'disagreements': np.zeros(NUM_BUCKETS, np.int64),
+              'samples': {}}
+    for part in parts:
+        merged['decisions'] += part['decisions']
+        merged['disagreements'] += part['disagreements']
+        for code, samples in part['samples'].items():
+            bucket = merged['samples'].setdefault(code, [])
+            bucket.extend(samples[:max_samples - len(bucket)])
+    return merged
+
+
+def report(merged, top=20):
+    """Disagreement rates per dimension and for the `top` combined buckets with most disagreements."""
+    decisions, disagreements = merged['decisions'], merged['disagreements']
+    shape = tuple(len(names) for _, names in DIMENSIONS)
+    by_dimension = {}
+    for axis, (name, names) in enumerate(DIMENSIONS):
+        others = tuple(i for i in range(len(DIMENSIONS)) if i != axis)
+        totals = decisions.reshape(shape).sum(axis=others)
+        differing = disagreements.reshape(shape).sum(axis=others)
+        by_dimension[name] = [
+            {name: names[i], 'decisions': int(totals[i]), 'disagreements': int(differing[i]),
+             'rate': differing[i] / totals[i]}
+            for i in range(len(names)) if totals[i]
+        ]
+    buckets = []
+    for code in np.argsort(-disagreements, kind='stable')[:top]:
+        if not disagreements[code]:
+            break
+        buckets.append(dict(bucket_labels(int(code)), decisions=int(decisions[code]),
+                            disagreements=int(disagreements[code]), rate=disagreements[code] / decisions[code],
+                            samples=merged['samples'].get(int(code), [])))
+    total = int(decisions.sum())
+    return {
+        'decisions': total,
+        'disagreements': int(disagreements.sum()),
+        'rate': disagreements.sum() / total if total else 0.0,
+        'by_dimension': by_dimension,
+        'buckets': buckets,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the decisions of two strategies on recorded frames.")
+    parser.add_argument('paths', nargs='+', help="recordings written by main.py --record")
+    parser.add_argument('--a', default='roles_6_10', help="baseline strategy")
+    parser.add_argument('--b', default='roles_6_11', help="candidate strategy")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=256, help="frames per batched policy call")
+    parser.add_argument('--samples', type=int, default=3, help="sample disagreements kept per bucket")
+    parser.add_argument('--top', type=int, default=20, help="combined buckets listed in the report")
+    parser.add_argument('--output', default='decision_diff.json', help="path of the JSON report")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    work = partial(diff_file, strategy_a=args.a, strategy_b=args.b, batch_size=args.batch_size,
+                   max_samples=args.samples)
+    with ProcessPoolExecutor(max_workers=min(args.workers or os.cpu_count(), len(args.paths))) as executor:
+        parts = executor.map(work, args.paths)
+        result = dict(report(merge(parts, args.samples), args.top), a=args.a, b=args.b, recordings=len(args.paths),
+                      wall_time=time.perf_counter() - start)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{args.a} vs {args.b}: {result['disagreements']} of {result['decisions']} decisions differ "
+          f"({result['rate']:.1%}) over {len(args.paths)} recordings in {result['wall_time']:.1f}s")
+    for name, rows in result['by_dimension'].items():
+        print(f"by {name}: " + ", ".join(f"{row[name]} {row['rate']:.1%}" for row in rows))
+    for row in result['buckets'][:10]:
+        print(f"{row['role']:<3} {row['game_mode']:<9} ball:{row['ball']:<9} {row['zone']:<9} "
+              f"{row['disagreements']:>7} / {row['decisions']:<7} ({row['rate']:.1%})")
+    return result
+
+
+if __name__ == '__main__':
+    main()
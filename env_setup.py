@@ -1,18 +1,54 @@
 import gfootball.env as football_env
 
-def create_football_env():
-    env = football_env.create_environment(
-        env_name='11_vs_11_easy_stochastic',
-        stacked=False,
-        representation='raw',
-        rewards='scoring',
-        write_goal_dumps=False,
-        write_full_episode_dumps=False,
-        write_video=False,
-        logdir="dump",
-        render=True,
-        number_of_left_players_agent_controls=11,
-        number_of_right_players_agent_controls=0,
-        other_config_options={'action_set': 'full'}
-    )
-    return env
\ No newline at end of file
+# Options shared by every profile (create_environment keyword arguments)
+BASE_ENV_OPTIONS = dict(
+    env_name='11_vs_11_easy_stochastic',
+    stacked=False,
+    representation='raw',
+    rewards='scoring',
+    write_goal_dumps=False,
+    write_full_episode_dumps=False,
+    write_video=False,
+    logdir="dump",
+    render=False,
+    number_of_left_players_agent_controls=11,
+    number_of_right_players_agent_controls=0,
+    other_config_options={'action_set': 'full'},
+)
+
+# Named environment profiles, applied on top of BASE_ENV_OPTIONS
+ENV_PROFILES = {
+    # Batch evaluation: no rendering, no dumps
+    'headless': {},
+    'headless_medium': {'env_name': '11_vs_11_stochastic'},
+    'headless_hard': {'env_name': '11_vs_11_hard_stochastic'},
+    # Watch the match in a window
+    'debug': {'render': True},
+    # Full-episode dumps and videos written to logdir
+    'video': {'render': True, 'write_full_episode_dumps': True, 'write_video': True},
+    # Our agents control both teams; observations 11..21 are the right team's, already mirrored by gfootball
+    'head_to_head': {'number_of_right_players_agent_controls': 11},
+}
+DEFAULT_PROFILE = 'headless'
+
+def get_env_options(profile=DEFAULT_PROFILE, **overrides):
+    """create_environment arguments for a profile, with keyword overrides (e.g. env_name)."""
+    if profile not in ENV_PROFILES:
+        raise ValueError(f"Unknown environment profile {profile!r}, expected one of {sorted(ENV_PROFILES)}")
+    extra_config = overrides.pop('other_config_options', None) or {}
+    options = dict(BASE_ENV_OPTIONS)
+    options.update(ENV_PROFILES[profile])
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    options['other_config_options'] = {**BASE_ENV_OPTIONS['other_config_options'], **extra_config}
+    return options
+
+def controls_both_teams(profile):
+    """Whether agents play both teams in a profile, as head-to-head matches need."""
+    return get_env_options(profile)['number_of_right_players_agent_controls'] > 0
+
+def create_football_env(profile=DEFAULT_PROFILE, **overrides):
+    return football_env.create_environment(**get_env_options(profile, **overrides))
+
+def seed_env(env, seed):
+    """Seeds the game engine for the next env.reset(); gfootball reads the seed from its config on reset."""
+    env.unwrapped._config['game_engine_random_seed'] = seed
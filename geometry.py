@@ -0,0 +1,61 @@
+import numpy as np
+
+from step_caches import step_cache
+
+MY_GOAL = np.array([-1.0, 0.0])
+OPPONENT_GOAL = np.array([1.0, 0.0])
+
+
+def _lengths(vectors):
+    return np.sqrt(vectors[..., 0] * vectors[..., 0] + vectors[..., 1] * vectors[..., 1])
+
+
+def _angles(vectors):
+    return np.arctan2(vectors[..., 1], vectors[..., 0])
+
+
+class TeamGeometry:
+    """Distances and angles between all players, the ball and both goals for one step.
+
+    Players are stacked left team first, then right team, so with 11 players a
+    side the pairwise matrices are 22x22. Entry [i, j] describes the vector
+    pointing from player i to player j (angles follow `np.arctan2(dy, dx)`).
+    """
+
+    def __init__(self, frame):
+        self.num_left = len(frame.left_team)
+        self.positions = np.concatenate([frame.left_team, frame.right_team])
+
+        deltas = self.positions[np.newaxis, :, :] - self.positions[:, np.newaxis, :]
+        self.pairwise_distances = _lengths(deltas)
+        self.pairwise_angles = _angles(deltas)
+
+        to_ball = frame.ball[:2] - self.positions
+        self.ball_distances = _lengths(to_ball)
+        self.ball_angles = _angles(to_ball)
+
+        to_my_goal = MY_GOAL - self.positions
+        self.my_goal_distances = _lengths(to_my_goal)
+        self.my_goal_angles = _angles(to_my_goal)
+
+        to_opponent_goal = OPPONENT_GOAL - self.positions
+        self.opponent_goal_distances = _lengths(to_opponent_goal)
+        self.opponent_goal_angles = _angles(to_opponent_goal)
+
+    # Team blocks of the pairwise matrix (views, no copies)
+    @property
+    def left_to_left(self):
+        return self.pairwise_distances[:self.num_left, :self.num_left]
+
+    @property
+    def left_to_right(self):
+        return self.pairwise_distances[:self.num_left, self.num_left:]
+
+    @property
+    def right_to_right(self):
+        return self.pairwise_distances[self.num_left:, self.num_left:]
+
+    @step_cache
+    def closest_opponent_distances(self):
+        """Distance from every left player to the nearest right player."""
+        return self.left_to_right.min(axis=1)
@@ -1,35 +1,575 @@
+import argparse
+import contextlib
+import json
 import logging
+import multiprocessing as mp
+import os
+import time
 from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import util
 
-from env_setup import create_football_env
-from wrappers import ObservationWrapper, ActionWrapper
-from strategies.advanced_strategy import advanced_strategy
-
-def run_match():
-    env = create_football_env()
-    action_wrapper = ActionWrapper(env)
-    observations = env.reset()
-    obs_wrapper = ObservationWrapper(observations)
-    left_reward = right_reward = 0
-    while True:
-        actions = advanced_strategy(obs_wrapper)
-        observations, rewards, dones, infos = action_wrapper.step(actions)
-        obs_wrapper = ObservationWrapper(observations)
+import numpy as np
+
+from env_setup import (DEFAULT_PROFILE, ENV_PROFILES, controls_both_teams, create_football_env, get_env_options,
+                       seed_env)
+from wrappers import ObservationWrapper, ActionWrapper, TeamFrame
+from policy_server import PolicyClient, PolicyServer
+from recorder import Recorder
+from strategies import profiling
+from strategies.registry import DEFAULT_STRATEGY, load_batch_strategy, load_strategy
+from results_store import ResultsStore, job_id, strategy_version, summarize
+from sequential import SPRT, MatchStatistics, StoppingRule
+from step_timing import StepTimer, format_summary, merge_summaries
+from supervisor import kill_pool, supervise
+from vec_env import LocalVectorEnv, SubprocVectorEnv
+
+# Extra time the parent allows on top of --match-timeout before it kills a hung worker
+HARD_TIMEOUT_GRACE = 30.0
+
+# Environment(s) owned by this worker process, built once by init_worker
+_worker_env = None
+_worker_vec_env = None
+# init_worker's environment arguments and the finalizer closing the current environment(s)
+_worker_env_config = None
+_worker_env_finalizer = None
+# Set when actions come from a shared PolicyServer instead of a local strategy
+_policy_client = None
+
+def init_worker(profile=DEFAULT_PROFILE, env_name=None, num_envs=1, subprocess_envs=False, policy_channels=None,
+                profile_roles=False):
+    """Builds the worker's environment(s) once; every match it plays reuses them via env.reset().
+
+    With num_envs > 1 the worker holds a vector of environments, in this
+    process or one subprocess each, for run_vector_matches. With
+    policy_channels (PolicyServer.channels) run_match asks the policy server
+    for actions. With profile_roles every match result carries the role
+    function timings of that match under 'role_profile'.
+    """
+    global _worker_env_config, _policy_client
+    logging.getLogger('gfootball').setLevel(logging.WARNING)
+    _worker_env_config = (profile, env_name, num_envs, subprocess_envs)
+    _build_worker_envs()
+    if policy_channels is not None:
+        _policy_client = PolicyClient(*policy_channels)
+    if profile_roles:
+        profiling.enable()
+
+def _build_worker_envs():
+    global _worker_env, _worker_vec_env, _worker_env_finalizer
+    profile, env_name, num_envs, subprocess_envs = _worker_env_config
+    # multiprocessing children skip atexit handlers, so cleanup goes through util.Finalize
+    if num_envs > 1:
+        env_fns = [partial(create_football_env, profile, env_name=env_name)] * num_envs
+        _worker_vec_env = (SubprocVectorEnv if subprocess_envs else LocalVectorEnv)(env_fns)
+        _worker_env_finalizer = util.Finalize(_worker_vec_env, _worker_vec_env.close, exitpriority=5)
+    else:
+        _worker_env = create_football_env(profile, env_name=env_name)
+        _worker_env_finalizer = util.Finalize(_worker_env, _worker_env.close, exitpriority=5)
+
+def _rebuild_worker_envs():
+    """Replaces the worker's environment(s) after an engine exception, which can leave them unusable.
+
+    Without this a worker would fail every later match on the broken engine
+    (e.g. a dead SubprocVectorEnv child) instead of only the one that raised.
+    """
+    if _worker_env_config is None:
+        return
+    try:
+        _worker_env_finalizer()
+    except Exception:
+        logging.exception("Closing the worker's broken environment failed")
+    _build_worker_envs()
+
+class MatchTimeout(Exception):
+    """A match went past its step or wall-clock limit."""
+
+class StepLimitExceeded(MatchTimeout):
+    """A match went past its step limit; with a seed it always will, so it is not retried."""
+
+def run_match(strategy=DEFAULT_STRATEGY, seed=None, env=None, max_steps=None, time_limit=None, opponent=None,
+              step_timing=False, record=None):
+    """Plays one match and returns its result as a dict.
+
+    `env` defaults to the worker's environment. With a `seed` the engine and
+    the strategies' np.random draws are seeded, so the match can be replayed.
+    Raises StepLimitExceeded (a MatchTimeout) after `max_steps` steps, or
+    MatchTimeout after `time_limit` seconds.
+
+    With an `opponent` strategy the environment must give agents both teams
+    (the 'head_to_head' profile): the first half of the agents play for
+    `strategy`, the second half for `opponent`. The right team's frame is the
+    left one mirrored (TeamFrame.mirrored), and gfootball flips the right
+    agents' actions back itself. Self-play (`opponent` is `strategy`) takes
+    two team decisions per step, about 2x the policy time of a match against
+    the built-in AI; a batched call for the two teams is no faster at K=2
+    (see strategies.batched_strategy.MIN_BATCH), so each team is decided on
+    its own.
+
+    With `step_timing` the result carries a per-phase breakdown of the step
+    wall time (step_timing.StepTimer.summary) under 'step_timing'. With a
+    `record` path every step's frame and our (left) agents' actions are
+    written there (recorder.Recorder), also for a match that fails.
+    """
+    if _policy_client is not None:
+        # The server wraps the raw observations and runs the strategy it was started with
+        policy = None
+    else:
+        policy = load_strategy(strategy)
+    opponent_policy = load_strategy(opponent) if opponent is not None else None
+    # Fall back to a throwaway environment when not running in a persistent worker
+    throwaway = env is None and _worker_env is None
+    worker_env = env is None and not throwaway
+    if env is None:
+        env = create_football_env() if throwaway else _worker_env
+    _reset_role_profile()
+    start = time.perf_counter()
+    steps = left_reward = right_reward = 0
+    finished = False
+    recorder = Recorder(record) if record is not None else None
+    try:
+        action_wrapper = ActionWrapper(env)
+        if seed is not None:
+            seed_env(env, seed)
+            np.random.seed(seed)
+        observations = env.reset()
+        if opponent_policy is not None and len(observations) % 2:
+            raise ValueError(f"a match against an opponent needs agents on both teams, got {len(observations)} agents")
+        timer = StepTimer() if step_timing else None
+        clock = time.perf_counter_ns
+        while True:
+            started = wrapped = clock()
+            frame = None
+            if policy is None:
+                actions = _policy_client.act(observations)
+            elif opponent_policy is not None:
+                half = len(observations) // 2
+                left = ObservationWrapper(observations[:half])
+                right = ObservationWrapper.from_frame(left.frame.mirrored(
+                    [obs['active'] for obs in observations[half:]],
+                    [obs['sticky_actions'] for obs in observations[half:]],
+                ))
+                frame = left.frame
+                wrapped = clock()
+                actions = list(policy(left)) + list(opponent_policy(right))
+            else:
+                obs_wrapper = ObservationWrapper(observations)
+                frame = obs_wrapper.frame
+                wrapped = clock()
+                actions = policy(obs_wrapper)
+            decided = clock()
+            previous_observations = observations
+            observations, rewards, dones, infos = action_wrapper.step(actions)
+            if timer is not None:
+                timer.record(started, wrapped, decided, clock())
+            if recorder is not None:
+                if frame is None:
+                    frame = TeamFrame.from_observations(previous_observations)
+                recorder.append(frame, actions[:frame.num_agents])
+            steps += 1
+            if rewards[0] == 1:
+                left_reward += 1
+            elif rewards[0] == -1:
+                right_reward += 1
+            if dones:
+                finished = True
+                break
+            if max_steps is not None and steps >= max_steps:
+                raise StepLimitExceeded(f"match not over after {steps} steps")
+            if time_limit is not None and time.perf_counter() - start > time_limit:
+                raise MatchTimeout(f"match not over after {time_limit:g}s ({steps} steps)")
+        if timer is not None:
+            timer.finish(clock())
+    except Exception as error:
+        # Running out of steps or time leaves the engine fine; anything else may not have
+        if worker_env and not isinstance(error, MatchTimeout):
+            _rebuild_worker_envs()
+        raise
+    finally:
+        if throwaway:
+            env.close()
+        if recorder is not None:
+            recorder.close(strategy=strategy, opponent=opponent, seed=seed, left_reward=left_reward,
+                           right_reward=right_reward, finished=finished)
+    result = {
+        'left_reward': left_reward,
+        'right_reward': right_reward,
+        'steps': steps,
+        'duration': time.perf_counter() - start,
+    }
+    if timer is not None:
+        result['step_timing'] = timer.summary()
+    if record is not None:
+        result['trajectory'] = record
+    return _attach_role_profile(result)
+
+def _reset_role_profile():
+    if profiling.active is not None:
+        profiling.active.reset()
+
+def _attach_role_profile(result):
+    """Adds the role timings recorded since _reset_role_profile to a task's result."""
+    if profiling.active is not None:
+        result['role_profile'] = profiling.active.snapshot()
+    return result
+
+def _advance_matches(active, transitions, tallies, results, start, max_steps=None, time_limit=None):
+    """Applies one step's transitions to the matches in `active`.
+
+    Finished matches move their result into `results`, and so do matches past
+    `max_steps` or `time_limit`, marked failed; returns the indices of the
+    unfinished ones and their new ObservationWrappers.
+    """
+    still_active, obs_wrappers = [], []
+    for i, (observations, rewards, dones, infos) in zip(active, transitions):
+        tally = tallies[i]
+        tally['steps'] += 1
         if rewards[0] == 1:
-            left_reward += 1
+            tally['left_reward'] += 1
         elif rewards[0] == -1:
-            right_reward += 1
+            tally['right_reward'] += 1
+        duration = time.perf_counter() - start
         if dones:
-            break
-    return left_reward, right_reward
+            results[i] = dict(tally, duration=duration)
+        elif max_steps is not None and tally['steps'] >= max_steps:
+            results[i] = dict(tally, duration=duration, failed=True,
+                              error=f"StepLimitExceeded: match not over after {tally['steps']} steps")
+        elif time_limit is not None and duration > time_limit:
+            results[i] = dict(tally, duration=duration, failed=True,
+                              error=f"MatchTimeout: match not over after {time_limit:g}s ({tally['steps']} steps)")
+        else:
+            still_active.append(i)
+            obs_wrappers.append(ObservationWrapper(observations))
+    return still_active, obs_wrappers
 
-if __name__ == '__main__':
+def _new_tallies(count):
+    return [{'left_reward': 0, 'right_reward': 0, 'steps': 0} for _ in range(count)]
+
+def _seed_vector_env(envs, seeds):
+    # Engines are seeded per match; the policy's np.random stream is shared by the batch
+    if seeds is not None:
+        envs.seed(seeds, range(len(seeds)))
+        np.random.seed(seeds[0])
+
+def run_vector_matches(strategy=DEFAULT_STRATEGY, count=None, seeds=None, max_steps=None, time_limit=None):
+    """Plays `count` matches at once on the worker's vector env and returns their results.
+
+    Each step stacks the observations of all unfinished matches into one
+    batched policy call returning a (K, num_agents) action array. A match past
+    `max_steps` steps or `time_limit` seconds (counted from the start of the
+    batch) is dropped from the batch and returned with failed=True.
+    """
+    policy = load_batch_strategy(strategy)
+    envs = _worker_vec_env
+    count = envs.num_envs if count is None else count
+    start = time.perf_counter()
+    _seed_vector_env(envs, seeds)
+    _reset_role_profile()
+
+    tallies = _new_tallies(count)
+    results = {}
+    active = list(range(count))
+    try:
+        obs_wrappers = [ObservationWrapper(observations) for observations in envs.reset(active)]
+        while active:
+            actions = policy(obs_wrappers)
+            transitions = envs.step([a.tolist() for a in actions], active)
+            active, obs_wrappers = _advance_matches(active, transitions, tallies, results, start, max_steps,
+                                                    time_limit)
+    except Exception:
+        _rebuild_worker_envs()
+        raise
+    # The batch shares one profile, carried by its first match
+    _attach_role_profile(results[0])
+    return [results[i] for i in range(count)]
+
+def run_pipelined_matches(strategy=DEFAULT_STRATEGY, count=None, seeds=None, max_steps=None, time_limit=None):
+    """Like run_vector_matches, but overlaps policy compute with engine steps.
+
+    The matches are split into two groups that are stepped alternately: while
+    one group's engines run in their subprocesses (step_async), the policy
+    handles the group whose step just came back. Needs SubprocVectorEnv for
+    the overlap; with LocalVectorEnv it is equivalent to run_vector_matches.
+    """
+    policy = load_batch_strategy(strategy)
+    envs = _worker_vec_env
+    count = envs.num_envs if count is None else count
+    start = time.perf_counter()
+    _seed_vector_env(envs, seeds)
+    _reset_role_profile()
+
+    tallies = _new_tallies(count)
+    results = {}
+    groups = [group for group in (list(range(0, count, 2)), list(range(1, count, 2))) if group]
+    try:
+        for group in groups:
+            obs_wrappers = [ObservationWrapper(observations) for observations in envs.reset(group)]
+            envs.step_async([a.tolist() for a in policy(obs_wrappers)], group)
+        while groups:
+            for g, group in enumerate(groups):
+                # The other group's engine step stays in flight while this one is decided
+                transitions = envs.step_wait(group)
+                groups[g], obs_wrappers = _advance_matches(group, transitions, tallies, results, start,
+                                                           max_steps, time_limit)
+                if groups[g]:
+                    envs.step_async([a.tolist() for a in policy(obs_wrappers)], groups[g])
+            groups = [group for group in groups if group]
+    except Exception:
+        # Steps still in flight and a child that raised leave the vector env unusable
+        _rebuild_worker_envs()
+        raise
+    _attach_role_profile(results[0])
+    return [results[i] for i in range(count)]
+
+class WorkerPool:
+    """ProcessPoolExecutor of match workers plus the PolicyServer they talk to, if any.
+
+    Used by supervisor.supervise, which rebuilds it after a crash. The policy
+    server is restarted along with the workers: a killed worker never hands its
+    client id back and may leave a request behind in the server.
+    """
+
+    def __init__(self, args, workers):
+        self.args = args
+        self.workers = workers
+        self.executor = self.policy_server = None
+
+    def start(self):
+        args = self.args
+        # ProcessPoolExecutor only recycles workers (max_tasks_per_child) with spawned processes
+        context = mp.get_context('spawn' if args.recycle_after else None)
+        if args.policy_server:
+            # Spare client ids cover workers that crash without returning theirs
+            self.policy_server = PolicyServer(args.strategy, num_clients=2 * self.workers,
+                                              max_batch=args.max_batch or self.workers,
+                                              max_wait=args.max_wait_ms / 1000,
+                                              shared_memory=args.shm_transport,
+                                              num_agents=get_env_options(args.profile)[
+                                                  'number_of_left_players_agent_controls'],
+                                              context=context).start()
+        # Each worker process keeps its environment(s) for all its matches
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=init_worker,
+            initargs=(args.profile, args.env_name, args.envs_per_worker, args.subprocess_envs,
+                      self.policy_server and self.policy_server.channels, args.profile_roles),
+            mp_context=context, max_tasks_per_child=args.recycle_after,
+        )
+        return self.executor
+
+    def stop(self, kill=False):
+        if self.executor is not None:
+            if kill:
+                kill_pool(self.executor)
+            else:
+                self.executor.shutdown()
+            self.executor = None
+        if self.policy_server is not None:
+            self.policy_server.stop()
+            self.policy_server = None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Play a batch of matches and report the results.")
+    parser.add_argument('--matches', type=int, default=10, help="number of matches to play")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    # Profiles giving agents both teams are for head-to-head matches (tournament.py)
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        choices=sorted(profile for profile in ENV_PROFILES if not controls_both_teams(profile)),
+                        help="environment profile from env_setup.ENV_PROFILES")
+    parser.add_argument('--env-name', default=None, help="scenario overriding the profile's env_name")
+    parser.add_argument('--strategy', default=DEFAULT_STRATEGY,
+                        help="'module:function' or a role module such as strategies.player_roles_6_11")
+    parser.add_argument('--envs-per-worker', type=int, default=1,
+                        help="environments stepped together per worker with one batched policy call")
+    parser.add_argument('--subprocess-envs', action='store_true',
+                        help="run each of a worker's environments in its own subprocess")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="overlap policy compute with engine steps (implies --subprocess-envs)")
+    parser.add_argument('--policy-server', action='store_true',
+                        help="decide actions in one shared policy process that batches requests from all workers")
+    parser.add_argument('--max-batch', type=int, default=None,
+                        help="policy server batch size limit (default: number of workers)")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help="how long the policy server waits to fill a batch")
+    parser.add_argument('--shm-transport', action='store_true',
+                        help="pass observations to the policy server through shared memory (needs --policy-server)")
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help="fail a match that is not over after this many steps")
+    parser.add_argument('--match-timeout', type=float, default=None,
+                        help="fail a match that is not over after this many seconds (a batch of "
+                             "--envs-per-worker matches gets that many times as long); "
+                             "a worker stuck in the engine is killed shortly after")
+    parser.add_argument('--retries', type=int, default=1, help="extra attempts for a failed match")
+    parser.add_argument('--recycle-after', type=int, default=None,
+                        help="replace each worker process after this many tasks")
+    parser.add_argument('--max-worker-memory-mb', type=float, default=None,
+                        help="rebuild the workers once one grows past this resident size")
+    parser.add_argument('--first-seed', type=int, default=0, help="engine seed of match 0, match i uses first_seed + i")
+    parser.add_argument('--store', default='results.jsonl',
+                        help="append-only results store; matches already in it are not played again")
+    parser.add_argument('--rerun', action='store_true', help="play every match even if the store already has it")
+    parser.add_argument('--sprt', nargs=2, type=float, metavar=('ELO0', 'ELO1'), default=None,
+                        help="stop early once an SPRT of elo0 against elo1 (vs the opponent) decides")
+    parser.add_argument('--alpha', type=float, default=0.05, help="SPRT false positive rate")
+    parser.add_argument('--beta', type=float, default=0.05, help="SPRT false negative rate")
+    parser.add_argument('--gd-precision', type=float, default=None,
+                        help="stop early once the goal difference confidence half-width is below this")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level of the reported intervals")
+    parser.add_argument('--min-matches', type=int, default=10, help="never stop early before this many matches")
+    parser.add_argument('--profile-roles', action='store_true',
+                        help="time every role function call and report latencies per role and game mode")
+    parser.add_argument('--step-timing', action='store_true',
+                        help="split every step into wrapper, policy, engine and bookkeeping time")
+    parser.add_argument('--record', metavar='DIR', default=None,
+                        help="write a compact trajectory of every match to DIR/<job id>.npz")
+    parser.add_argument('--output', default='results.json', help="path of the JSON summary")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.pipeline:
+        if args.envs_per_worker < 2:
+            raise SystemExit("--pipeline needs --envs-per-worker of at least 2")
+        args.subprocess_envs = True
+    if args.shm_transport and not args.policy_server:
+        raise SystemExit("--shm-transport needs --policy-server")
+    if args.profile_roles and args.policy_server:
+        raise SystemExit("--profile-roles times role functions in the match workers; drop --policy-server")
+    if args.record and args.policy_server:
+        raise SystemExit("--record needs reproducible matches, but the policy server's random draws are not "
+                         "seeded per match; drop --policy-server")
+    if args.policy_server and args.envs_per_worker > 1:
+        raise SystemExit("--policy-server plays one environment per worker; drop --envs-per-worker")
+    if args.step_timing and args.envs_per_worker > 1:
+        raise SystemExit("--step-timing times run_match steps; drop --envs-per-worker")
+    if args.record and args.envs_per_worker > 1:
+        raise SystemExit("--record is done by run_match; drop --envs-per-worker")
     # Suppress INFO level logs from gfootball library
     football_logger = logging.getLogger('gfootball')
     football_logger.setLevel(logging.WARNING)
-    # Run the main function in parallel using ProcessPoolExecutor
-    with ProcessPoolExecutor() as executor:
-        futures = [executor.submit(run_match) for _ in range(10)]
-        for future in futures:
-            left_reward, right_reward = future.result()
-            print(f"left_reward:{left_reward}, right_reward:{right_reward}")
\ No newline at end of file
+    # Fail fast on a bad spec instead of in every worker
+    policy = load_strategy(args.strategy)
+    if args.profile_roles and hasattr(policy, 'batch'):
+        raise SystemExit(f"--profile-roles times the scalar role functions, which {args.strategy}'s "
+                         f"batched form bypasses; profile the role module instead")
+
+    results = []
+    start = time.perf_counter()
+    batch_size = args.envs_per_worker
+    workers = args.workers or os.cpu_count()
+
+    # Every match is a job identified by strategy version, scenario and seed
+    version = strategy_version(args.strategy)
+    jobs = {}
+    for match in range(args.matches):
+        seed = args.first_seed + match
+        jobs[match] = {
+            'job_id': job_id(args.strategy, version, args.profile, args.env_name, seed),
+            'strategy': args.strategy,
+            'strategy_version': version,
+            'profile': args.profile,
+            'env_name': args.env_name,
+            'seed': seed,
+        }
+    store = ResultsStore(args.store)
+    completed = {} if args.rerun else store.completed()
+    pending = []
+    for match, job in jobs.items():
+        if job['job_id'] in completed:
+            results.append(dict(completed[job['job_id']], match=match))
+        else:
+            pending.append(match)
+    if results:
+        print(f"{len(results)} of {args.matches} matches already in {args.store}, skipping them", flush=True)
+
+    # --matches is an upper bound when a stopping rule is configured
+    stats = MatchStatistics()
+    for result in results:
+        stats.update(result['left_reward'], result['right_reward'])
+    rule = StoppingRule(SPRT(*args.sprt, args.alpha, args.beta) if args.sprt else None,
+                        args.gd_precision, args.confidence, args.min_matches)
+    stopped = rule.check(stats)
+    if stopped:
+        pending = []
+
+    if batch_size > 1:
+        # One task plays up to batch_size matches side by side
+        run_batch = run_pipelined_matches if args.pipeline else run_vector_matches
+        # The matches of a batch share one process, so each gets batch_size times the match time limit
+        time_limit = args.match_timeout and args.match_timeout * batch_size
+        tasks = []
+        for first in range(0, len(pending), batch_size):
+            matches = pending[first:first + batch_size]
+            seeds = [jobs[match]['seed'] for match in matches]
+            tasks.append((matches, partial(run_batch, args.strategy, len(matches), seeds,
+                                           max_steps=args.max_steps, time_limit=time_limit)))
+    else:
+        if args.record:
+            os.makedirs(args.record, exist_ok=True)
+        tasks = [([match], partial(run_match, args.strategy, seed=jobs[match]['seed'],
+                                   max_steps=args.max_steps, time_limit=args.match_timeout,
+                                   step_timing=args.step_timing,
+                                   record=args.record and os.path.join(args.record, jobs[match]['job_id'] + '.npz')))
+                 for match in pending]
+    task_timeout = args.match_timeout and args.match_timeout * batch_size + HARD_TIMEOUT_GRACE
+
+    role_profiler = profiling.RoleProfiler() if args.profile_roles else None
+
+    # Matches are reported as they finish, not in submission order
+    outcomes = supervise(tasks, WorkerPool(args, workers), workers, args.retries, task_timeout,
+                         args.max_worker_memory_mb, permanent=(StepLimitExceeded,))
+    # Closing the generator on an early stop kills the matches still in flight
+    with contextlib.closing(outcomes):
+        for matches, task_results, error, attempts in outcomes:
+            if error is not None:
+                for match in matches:
+                    record = dict(jobs[match], failed=True, error=error, attempts=attempts)
+                    store.append(record)
+                    results.append(dict(record, match=match))
+                    print(f"match {match}: failed after {attempts} attempt(s): {error}", flush=True)
+                continue
+            if isinstance(task_results, dict):
+                task_results = [task_results]
+            for match, task_result in zip(matches, task_results):
+                if 'role_profile' in task_result:
+                    # Merged into the run's report instead of stored with every match
+                    task_result = dict(task_result)
+                    role_profiler.merge(task_result.pop('role_profile'))
+                record = dict(jobs[match], **task_result, attempts=attempts)
+                store.append(record)
+                result = dict(record, match=match)
+                results.append(result)
+                if result.get('failed'):
+                    # A match of a batch that went past its limits
+                    print(f"match {match}: failed: {result['error']}", flush=True)
+                    continue
+                stats.update(result['left_reward'], result['right_reward'])
+                print(f"match {result['match']}: left_reward:{result['left_reward']}, "
+                      f"right_reward:{result['right_reward']} ({result['steps']} steps, {result['duration']:.1f}s)",
+                      flush=True)
+            stopped = rule.check(stats)
+            if stopped:
+                break
+    if stopped:
+        print(f"stopped after {stats.matches} matches: {stopped}", flush=True)
+
+    summary = {
+        'config': vars(args),
+        'summary': summarize(results),
+        'statistics': stats.as_dict(args.confidence),
+        'stopped': stopped,
+        'role_profile': role_profiler and role_profiler.report(),
+        'step_timing': merge_summaries(r.get('step_timing') for r in results) if args.step_timing else None,
+        'wall_time': time.perf_counter() - start,
+        'results': sorted(results, key=lambda r: r['match']),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    if role_profiler is not None:
+        print(profiling.format_report(summary['role_profile']))
+    if summary['step_timing']:
+        print(format_summary(summary['step_timing']))
+    print(json.dumps(summary['summary']))
+    return summary
+
+if __name__ == '__main__':
+    main()
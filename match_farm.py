@@ -0,0 +1,337 @@
+"""Coordinator/worker mode for spreading matches over several machines.
+
+The coordinator holds a JobBoard of match jobs (strategy, profile, scenario,
+seed) and serves it over TCP with multiprocessing.managers. Workers on any
+host lease a job, play it and report the result. Leases expire when a worker
+stops sending heartbeats, which puts the job back on the board, and a job id
+is a hash of its content, so resubmitting a job or reporting it twice has no
+effect. A job whose match raised, or whose lease expired, is played again up
+to --retries times and then finished as failed, so one bad job cannot keep
+the coordinator waiting forever; worker processes killed by the engine are
+replaced.
+
+The manager connections carry pickles, so whoever knows the authkey can run
+code on the other side: coordinator and workers need a shared secret, from
+--authkey or the FARM_AUTHKEY environment variable (local mode makes up its
+own).
+
+    export FARM_AUTHKEY=$(python -c 'import secrets; print(secrets.token_hex(16))')
+    python match_farm.py coordinator --address 0.0.0.0:50000 --matches 200
+    python match_farm.py worker --address coordinator-host:50000 --processes 8
+    python match_farm.py local --matches 20 --processes 4   # both on localhost
+"""
+import argparse
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import Process
+from multiprocessing.managers import BaseManager
+
+from env_setup import DEFAULT_PROFILE, ENV_PROFILES, controls_both_teams, create_football_env
+from main import run_match
+from results_store import job_id, strategy_version, summarize
+from strategies.registry import DEFAULT_STRATEGY, load_strategy
+
+DEFAULT_PORT = 50000
+AUTHKEY_ENV = 'FARM_AUTHKEY'
+LEASE_TIMEOUT = 120.0  # seconds without a heartbeat before a leased job is re-queued
+HEARTBEAT_INTERVAL = 10.0  # keep well below the lease timeout
+POLL_INTERVAL = 1.0
+
+
+def make_job(strategy, seed, profile=DEFAULT_PROFILE, env_name=None):
+    """A match job; its id is results_store.job_id, so it depends only on its content and the strategy's source."""
+    version = strategy_version(strategy)
+    return {'job_id': job_id(strategy, version, profile, env_name, seed), 'strategy': strategy,
+            'strategy_version': version, 'profile': profile, 'env_name': env_name, 'seed': seed}
+
+
+class JobBoard:
+    """Pending, leased and finished jobs, kept by the coordinator.
+
+    Every method is safe to call from the manager's connection threads.
+    """
+
+    def __init__(self, lease_timeout=LEASE_TIMEOUT, max_attempts=2):
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.pending = OrderedDict()  # job_id -> job
+        self.leases = {}  # job_id -> (worker, deadline, job)
+        self.attempts = {}  # job_id -> leases handed out so far
+        self.results = OrderedDict()  # job_id -> result, in completion order
+
+    def submit(self, jobs):
+        """Adds jobs that are not already known; returns how many were new."""
+        added = 0
+        with self.lock:
+            for job in jobs:
+                job_id = job['job_id']
+                if job_id in self.pending or job_id in self.leases or job_id in self.results:
+                    continue
+                self.pending[job_id] = job
+                added += 1
+        return added
+
+    def _retry_or_fail(self, job, error, worker):
+        # Caller holds the lock and has already taken the job off the leases
+        job_id = job['job_id']
+        attempts = self.attempts.get(job_id, 0)
+        if attempts < self.max_attempts:
+            self.pending[job_id] = job
+        else:
+            logging.warning("Job %s failed after %d attempt(s): %s", job_id, attempts, error)
+            self.results[job_id] = dict(job, failed=True, error=error, attempts=attempts, worker=worker)
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        for job_id, (worker, deadline, job) in list(self.leases.items()):
+            if deadline < now:
+                logging.warning("Lease on job %s by %s expired", job_id, worker)
+                del self.leases[job_id]
+                self._retry_or_fail(job, f"lease expired on {worker}", worker)
+
+    def lease(self, worker):
+        """Next pending job for `worker`, or None if there is nothing to do right now."""
+        with self.lock:
+            self._requeue_expired()
+            if not self.pending:
+                return None
+            job_id, job = self.pending.popitem(last=False)
+            self.leases[job_id] = (worker, time.monotonic() + self.lease_timeout, job)
+            self.attempts[job_id] = self.attempts.get(job_id, 0) + 1
+            return job
+
+    def heartbeat(self, worker):
+        """Extends the leases held by `worker`."""
+        deadline = time.monotonic() + self.lease_timeout
+        with self.lock:
+            for job_id, (owner, _, job) in self.leases.items():
+                if owner == worker:
+                    self.leases[job_id] = (owner, deadline, job)
+
+    def complete(self, job_id, result):
+        """Records a result; later reports for the same job are ignored."""
+        with self.lock:
+            if job_id in self.results:
+                return False
+            self.leases.pop(job_id, None)
+            self.pending.pop(job_id, None)
+            self.results[job_id] = result
+            return True
+
+    def fail(self, job_id, error, worker):
+        """Reports that `worker` could not play a job it leased: it is re-queued or, out of attempts, failed."""
+        with self.lock:
+            lease = self.leases.get(job_id)
+            if lease is None or lease[0] != worker:
+                return False
+            del self.leases[job_id]
+            self._retry_or_fail(lease[2], error, worker)
+            return True
+
+    def finished(self):
+        with self.lock:
+            self._requeue_expired()
+            return not self.pending and not self.leases
+
+    def results_since(self, count):
+        """Results completed after the first `count` ones."""
+        with self.lock:
+            return list(self.results.values())[count:]
+
+
+class FarmManager(BaseManager):
+    pass
+
+
+# Client side registration; the coordinator binds the board itself in serve_board
+FarmManager.register('get_board')
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or 'localhost', int(port or DEFAULT_PORT)
+
+
+def serve_board(board, address, authkey):
+    """Serves `board` over TCP from a background thread of this process."""
+    class _BoardManager(BaseManager):
+        pass
+    _BoardManager.register('get_board', callable=lambda: board)
+    server = _BoardManager(address=address, authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def connect_board(address, authkey):
+    manager = FarmManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.get_board()
+
+
+def _heartbeat(board, worker, stop, interval):
+    while not stop.wait(interval):
+        try:
+            board.heartbeat(worker)
+        except (ConnectionError, EOFError):
+            return
+
+
+def work(address, authkey, idle_exit=True):
+    """Worker process loop: lease a job, play it, report it, until the board is done."""
+    logging.getLogger('gfootball').setLevel(logging.WARNING)
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    board = connect_board(address, authkey)
+    # Heartbeats keep this worker's leases alive while a match is running
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(board, worker, stop, HEARTBEAT_INTERVAL), daemon=True).start()
+    envs = {}
+    try:
+        while True:
+            job = board.lease(worker)
+            if job is None:
+                if idle_exit and board.finished():
+                    break
+                time.sleep(POLL_INTERVAL)
+                continue
+            scenario = (job['profile'], job['env_name'])
+            try:
+                version = strategy_version(job['strategy'])
+                if version != job['strategy_version']:
+                    # Results of other strategy code must not be stored under this job's id
+                    logging.warning("Job %s wants strategy version %s, this host has %s",
+                                    job['job_id'], job['strategy_version'], version)
+                    board.fail(job['job_id'], f"strategy version mismatch: {worker} has {version}", worker)
+                    continue
+                if scenario not in envs:
+                    envs[scenario] = create_football_env(job['profile'], env_name=job['env_name'])
+                result = run_match(job['strategy'], seed=job['seed'], env=envs[scenario])
+            except Exception as error:
+                # The environment may be in any state after a failure; the next job gets a fresh one
+                env = envs.pop(scenario, None)
+                if env is not None:
+                    env.close()
+                board.fail(job['job_id'], f'{type(error).__name__}: {error}', worker)
+                continue
+            board.complete(job['job_id'], dict(result, job_id=job['job_id'], seed=job['seed'], worker=worker))
+    except (ConnectionError, EOFError):
+        pass  # Coordinator is gone; an unfinished lease simply expires there
+    finally:
+        stop.set()
+        for env in envs.values():
+            env.close()
+
+
+def start_workers(address, processes, authkey):
+    workers = [Process(target=work, args=(address, authkey), daemon=True) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def run_workers(address, processes, authkey):
+    """Keeps `processes` workers going until they all leave normally.
+
+    A worker killed by its engine (its lease then expires on the coordinator)
+    is replaced, so a job that crashes the process cannot use up the workers.
+    """
+    workers = start_workers(address, processes, authkey)
+    while workers:
+        time.sleep(POLL_INTERVAL)
+        crashed = [worker for worker in workers if worker.exitcode not in (None, 0)]
+        workers = [worker for worker in workers if worker.exitcode is None]
+        for worker in crashed:
+            logging.warning("Worker process %d exited with code %s, starting another", worker.pid, worker.exitcode)
+        workers += start_workers(address, len(crashed), authkey)
+
+
+def coordinate(board, output):
+    """Waits until every job on the board is finished, printing results as they arrive, and writes the summary."""
+    start = time.perf_counter()
+    results = []
+    while True:
+        done = board.finished()
+        for result in board.results_since(len(results)):
+            results.append(result)
+            if result.get('failed'):
+                print(f"job {result['job_id']} (seed {result['seed']}): failed after {result['attempts']} attempt(s): "
+                      f"{result['error']}", flush=True)
+                continue
+            print(f"job {result['job_id']} (seed {result['seed']}): left_reward:{result['left_reward']}, "
+                  f"right_reward:{result['right_reward']} ({result['steps']} steps, {result['duration']:.1f}s)",
+                  flush=True)
+        if done:
+            break
+        time.sleep(POLL_INTERVAL)
+
+    summary = {
+        'summary': summarize(results),
+        'wall_time': time.perf_counter() - start,
+        'results': sorted(results, key=lambda r: r['seed']),
+    }
+    with open(output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary['summary']))
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Play matches on workers spread over several machines.")
+    parser.add_argument('mode', choices=('coordinator', 'worker', 'local'))
+    parser.add_argument('--address', default=f'localhost:{DEFAULT_PORT}', help="coordinator host:port")
+    parser.add_argument('--authkey', default=os.environ.get(AUTHKEY_ENV),
+                        help=f"shared secret between coordinator and workers (default: ${AUTHKEY_ENV})")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes on this host (default: CPU count)")
+    parser.add_argument('--matches', type=int, default=10, help="number of matches to play")
+    parser.add_argument('--first-seed', type=int, default=0, help="seed of the first match, the others follow")
+    # Profiles giving agents both teams are for head-to-head matches (tournament.py)
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        choices=sorted(profile for profile in ENV_PROFILES if not controls_both_teams(profile)),
+                        help="environment profile from env_setup.ENV_PROFILES")
+    parser.add_argument('--env-name', default=None, help="scenario overriding the profile's env_name")
+    parser.add_argument('--strategy', default=DEFAULT_STRATEGY,
+                        help="'module:function' or a role module such as strategies.player_roles_6_11")
+    parser.add_argument('--retries', type=int, default=1,
+                        help="extra attempts for a job whose match failed or whose worker was lost")
+    parser.add_argument('--lease-timeout', type=float, default=LEASE_TIMEOUT,
+                        help="seconds without a worker heartbeat before its job is re-queued")
+    parser.add_argument('--output', default='farm_results.json', help="path of the JSON summary")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    address = parse_address(args.address)
+    if args.authkey:
+        authkey = args.authkey.encode()
+    elif args.mode == 'local':
+        # Only this process's own workers need to know it
+        authkey = secrets.token_hex(16).encode()
+    else:
+        raise SystemExit(f"{args.mode} needs a shared secret: pass --authkey or set {AUTHKEY_ENV}")
+    processes = args.processes or os.cpu_count()
+    if args.mode == 'worker':
+        run_workers(address, processes, authkey)
+        return None
+
+    if args.lease_timeout <= 2 * HEARTBEAT_INTERVAL:
+        raise SystemExit(f"--lease-timeout must be longer than {2 * HEARTBEAT_INTERVAL:g}s")
+    load_strategy(args.strategy)
+    board = JobBoard(args.lease_timeout, max_attempts=1 + args.retries)
+    # Jobs go on the board before it is served, so no worker sees it empty and leaves
+    board.submit([make_job(args.strategy, seed, args.profile, args.env_name)
+                  for seed in range(args.first_seed, args.first_seed + args.matches)])
+    serve_board(board, address, authkey)
+    if args.mode == 'local':
+        threading.Thread(target=run_workers, args=(address, processes, authkey), daemon=True).start()
+    return coordinate(board, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import bisect
+import math
+
+import numpy as np
+
+# Below this distance to the target a player stays idle
+IDLE_RADIUS = 0.03
+
+# move_towards: a direction is horizontal when |dx| > 2|dy|, vertical when
+# |dy| > 2|dx| and diagonal otherwise. The table is indexed by
+# class * 4 + (dx > 0) * 2 + (dy > 0).
+_MOVE_TABLE = np.array([
+    1, 1, 5, 5,  # horizontal: action_left, action_right
+    3, 7, 3, 7,  # vertical: action_top, action_bottom
+    2, 8, 4, 6,  # diagonal: top_left, bottom_left, top_right, bottom_right
+])
+_MOVE_TABLE_LIST = _MOVE_TABLE.tolist()
+
+# get_movement_action: octant boundaries of arctan2(dy, dx), in ascending
+# order, and the action for each of the nine ranges they delimit
+_HEADING_BOUNDARIES = np.array([
+    -7 * np.pi / 8,
+    -5 * np.pi / 8,
+    -3 * np.pi / 8,
+    -np.pi / 8,
+    np.pi / 8,
+    3 * np.pi / 8,
+    5 * np.pi / 8,
+    7 * np.pi / 8,
+])
+_HEADING_BOUNDARIES_LIST = _HEADING_BOUNDARIES.tolist()
+_HEADING_TABLE = np.array([
+    1,  # action_left (angle < -7pi/8)
+    8,  # action_bottom_left
+    7,  # action_bottom
+    6,  # action_bottom_right
+    5,  # action_right
+    4,  # action_top_right
+    3,  # action_top
+    2,  # action_top_left
+    1,  # action_left (angle >= 7pi/8)
+])
+_HEADING_TABLE_LIST = _HEADING_TABLE.tolist()
+
+
+def move_actions(positions, targets):
+    """Discrete move actions from positions towards targets, arrays of shape (..., 2).
+
+    Same result as move_towards in the role modules for every pair,
+    including the IDLE_RADIUS dead zone.
+    """
+    direction = np.asarray(targets) - np.asarray(positions)
+    dx = direction[..., 0]
+    dy = direction[..., 1]
+    abs_dx = np.abs(dx)
+    abs_dy = np.abs(dy)
+
+    direction_class = np.where(abs_dx > 2 * abs_dy, 0, np.where(abs_dy > 2 * abs_dx, 1, 2))
+    actions = _MOVE_TABLE[direction_class * 4 + (dx > 0) * 2 + (dy > 0)]
+    return np.where(np.sqrt(dx * dx + dy * dy) < IDLE_RADIUS, 0, actions)
+
+
+def move_action(position, target):
+    """Scalar move_actions for a single pair, without any array conversion."""
+    dx = float(target[0]) - float(position[0])
+    dy = float(target[1]) - float(position[1])
+    if math.sqrt(dx * dx + dy * dy) < IDLE_RADIUS:
+        return 0  # action_idle
+
+    abs_dx = abs(dx)
+    abs_dy = abs(dy)
+    if abs_dx > 2 * abs_dy:
+        direction_class = 0
+    elif abs_dy > 2 * abs_dx:
+        direction_class = 1
+    else:
+        direction_class = 2
+    return _MOVE_TABLE_LIST[direction_class * 4 + (dx > 0) * 2 + (dy > 0)]
+
+
+def heading_actions(current_positions, target_positions):
+    """Array version of utils.get_movement_action (eight octants, no dead zone)."""
+    direction = np.asarray(target_positions) - np.asarray(current_positions)
+    angle = np.arctan2(direction[..., 1], direction[..., 0])
+    actions = _HEADING_TABLE[np.searchsorted(_HEADING_BOUNDARIES, angle, side='right')]
+    return np.where(np.isnan(angle), 0, actions)
+
+
+def heading_action(current_pos, target_pos):
+    """Scalar heading_actions for a single pair."""
+    angle = math.atan2(float(target_pos[1]) - float(current_pos[1]),
+                       float(target_pos[0]) - float(current_pos[0]))
+    if math.isnan(angle):
+        return 0  # action_idle
+    return _HEADING_TABLE_LIST[bisect.bisect_right(_HEADING_BOUNDARIES_LIST, angle)]
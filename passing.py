@@ -0,0 +1,77 @@
+import numpy as np
+
+from step_caches import step_cache
+
+# Default weights reproduce the original find_best_teammate_to_pass score:
+# closest_opp_dist * 5 + teammate_x * 2 - distance_to_teammate
+OPENNESS_WEIGHT = 5.0
+PROGRESS_WEIGHT = 2.0
+DISTANCE_WEIGHT = 1.0
+
+
+class PassEvaluator:
+    """Scores every (passer, receiver) pair of the left team for one step.
+
+    All terms are (N, N) matrices indexed [passer, receiver]:
+    - openness: distance from the receiver to its closest opponent
+    - progress: x position of the receiver (more forward is better)
+    - distance: passer to receiver distance
+    - lane_clearance: distance from the passing lane (segment passer->receiver)
+      to the closest opponent, i.e. how hard the pass is to intercept
+
+    The evaluator is built at most once per step (see
+    ObservationWrapper.pass_evaluator) and every query is a row lookup, so its
+    cost does not grow with the number of roles asking for a pass target. The
+    O(N*N*M) lane term is only computed when a query gives it a weight.
+    """
+
+    def __init__(self, frame, geometry):
+        self.left_positions = frame.left_team
+        self.right_positions = frame.right_team
+        self.openness = geometry.closest_opponent_distances
+        self.progress = frame.left_team[:, 0]
+        self.distance = geometry.left_to_left
+        # A player can receive if active and not the passer
+        self.receivable = frame.left_team_active[np.newaxis, :] & ~np.eye(len(frame.left_team), dtype=bool)
+
+    @step_cache
+    def lane_clearance(self):
+        passers = self.left_positions[:, np.newaxis, np.newaxis, :]
+        receivers = self.left_positions[np.newaxis, :, np.newaxis, :]
+        opponents = self.right_positions[np.newaxis, np.newaxis, :, :]
+
+        lane = receivers - passers
+        lane_length_sq = np.maximum((lane * lane).sum(axis=-1), 1e-12)
+        t = np.clip(((opponents - passers) * lane).sum(axis=-1) / lane_length_sq, 0.0, 1.0)
+        closest_point = passers + t[..., np.newaxis] * lane
+        offset = opponents - closest_point
+        return np.sqrt((offset * offset).sum(axis=-1)).min(axis=-1)
+
+    def scores(self, passer, lane_weight=0.0):
+        """Score of every receiver for the given passer (higher is better)."""
+        score = (OPENNESS_WEIGHT * self.openness
+                 + PROGRESS_WEIGHT * self.progress
+                 - DISTANCE_WEIGHT * self.distance[passer])
+        if lane_weight:
+            score = score + lane_weight * self.lane_clearance[passer]
+        return score
+
+    def rank(self, passer, mask=None, min_openness=0.1, lane_weight=0.0, limit=None):
+        """Receivers for the given passer, best first.
+
+        Only players in `mask` (all receivable teammates if None) whose closest
+        opponent is at least `min_openness` away are returned.
+        """
+        eligible = self.receivable[passer] & (self.openness >= min_openness)
+        if mask is not None:
+            eligible &= mask
+        candidates = np.flatnonzero(eligible)
+        # Stable sort keeps the lowest index first among equal scores
+        order = np.argsort(-self.scores(passer, lane_weight)[candidates], kind='stable')
+        ranked = candidates[order]
+        return ranked if limit is None else ranked[:limit]
+
+    def best(self, passer, mask=None, min_openness=0.1, lane_weight=0.0):
+        """Best receiver index for the given passer, or -1 if nobody is open."""
+        ranked = self.rank(passer, mask, min_openness, lane_weight, limit=1)
+        return int(ranked[0]) if len(ranked) else -1
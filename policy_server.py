@@ -0,0 +1,186 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import util
+
+from shm_transport import SLOT_ERROR, SharedFrameRing
+from strategies.registry import DEFAULT_STRATEGY, load_batch_strategy
+from wrappers import ObservationWrapper
+
+# Seconds a client waits for its actions before it gives up on the server
+REPLY_TIMEOUT = 120.0
+
+
+class PolicyError(Exception):
+    """The policy server could not decide a client's step (the strategy raised, or no reply came)."""
+
+
+def serve(strategy, requests, responses, max_batch, max_wait, ring=None, ready=None):
+    """Policy server loop: batches pending requests and answers each one.
+
+    Blocks for the first request, then keeps collecting until `max_batch`
+    requests are queued or `max_wait` seconds have passed, and runs the batched
+    strategy once for the whole batch. A None request stops the server.
+
+    A request without observations refers to the client's slot in the shared
+    `ring`: the slot is wrapped in place, the actions are written back into it
+    and the client's `ready` event is set.
+
+    If the strategy raises, every client of the batch gets a PolicyError
+    reply instead of actions and the server goes on with the next batch.
+    """
+    policy = load_batch_strategy(strategy)
+    stopping = False
+    while not stopping:
+        first = requests.get()
+        if first is None:
+            break
+        batch = [first]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < max_batch:
+            try:
+                request = requests.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if request is None:
+                stopping = True
+                break
+            batch.append(request)
+
+        try:
+            obs_wrappers = [
+                ObservationWrapper.from_frame(ring.frame(client_id)) if observations is None
+                else ObservationWrapper(observations)
+                for client_id, observations in batch
+            ]
+            actions = policy(obs_wrappers)
+        except Exception as error:
+            # The clients' matches fail (and are retried) like a strategy error in the worker would
+            for client_id, observations in batch:
+                responses[client_id].put(PolicyError(f'{type(error).__name__}: {error}'))
+                if observations is None:
+                    ring.write_error(client_id)
+                    ready[client_id].set()
+            continue
+        for (client_id, observations), client_actions in zip(batch, actions):
+            if observations is None:
+                ring.write_actions(client_id, client_actions)
+                ready[client_id].set()
+            else:
+                responses[client_id].put(client_actions.tolist())
+
+
+class PolicyServer:
+    """One policy process answering observation requests from many simulator workers.
+
+    `channels` is passed to each worker (e.g. through a ProcessPoolExecutor
+    initializer), which builds a PolicyClient from it. Client ids come from a
+    pool of `num_clients`; a worker returns its id on a clean exit, so size the
+    pool with some headroom for workers that crash or get recycled.
+
+    With `shared_memory=True` observations and actions go through a
+    SharedFrameRing with one slot per client id instead of being pickled;
+    only the client id crosses the request queue.
+
+    `context` is the multiprocessing context of the workers, whose queues and
+    events must come from the same start method. A client waits at most
+    `reply_timeout` seconds for an answer, so a dead server fails matches
+    instead of hanging them.
+
+    The strategy's np.random draws happen in the server, in request arrival
+    order, so seeded matches played through it are not reproducible.
+    """
+
+    def __init__(self, strategy=DEFAULT_STRATEGY, num_clients=1, max_batch=None, max_wait=0.002,
+                 shared_memory=False, num_agents=11, context=None, reply_timeout=REPLY_TIMEOUT):
+        context = context or mp.get_context()
+        self.reply_timeout = reply_timeout
+        self.requests = context.Queue()
+        self.responses = [context.Queue() for _ in range(num_clients)]
+        self.client_ids = context.Queue()
+        for client_id in range(num_clients):
+            self.client_ids.put(client_id)
+        self.ring = self.ready = None
+        if shared_memory:
+            self.ring = SharedFrameRing.create(num_clients, num_agents=num_agents)
+            self.ready = [context.Event() for _ in range(num_clients)]
+        self.process = context.Process(
+            target=serve,
+            args=(strategy, self.requests, self.responses, max_batch or num_clients, max_wait, self.ring, self.ready),
+            daemon=True,
+        )
+
+    @property
+    def channels(self):
+        return self.requests, self.responses, self.client_ids, self.ring, self.ready, self.reply_timeout
+
+    def start(self):
+        self.process.start()
+        return self
+
+    def stop(self):
+        self.requests.put(None)
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+        if self.ring is not None:
+            self.ring.unlink()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class PolicyClient:
+    """Worker side of a PolicyServer: sends raw observations, receives actions."""
+
+    def __init__(self, requests, responses, client_ids, ring=None, ready=None, reply_timeout=REPLY_TIMEOUT):
+        self.client_id = client_ids.get()
+        self.requests = requests
+        self.response = responses[self.client_id]
+        self.ring = ring
+        self.ready = ready[self.client_id] if ready is not None else None
+        self.reply_timeout = reply_timeout
+        self.timed_out = False  # a late reply to a timed out request may still arrive
+        # Hand the id back when the worker process exits cleanly
+        util.Finalize(self, client_ids.put, args=(self.client_id,), exitpriority=10)
+
+    def _reply(self):
+        try:
+            reply = self.response.get(timeout=self.reply_timeout)
+        except queue.Empty:
+            self.timed_out = True
+            raise PolicyError(f"no reply from the policy server after {self.reply_timeout:g}s") from None
+        if isinstance(reply, PolicyError):
+            raise reply
+        return reply
+
+    def _drop_stale_replies(self):
+        # A reply that came after its request timed out must not answer the next one
+        while True:
+            try:
+                self.response.get_nowait()
+            except queue.Empty:
+                return
+
+    def act(self, observations):
+        """Actions for one step; raises PolicyError if the server failed or did not answer."""
+        if self.timed_out:
+            self._drop_stale_replies()
+            self.timed_out = False
+        if self.ring is None:
+            self.requests.put((self.client_id, observations))
+            return self._reply()
+        # The client id doubles as the slot index in the shared ring
+        self.ring.write_observations(self.client_id, observations)
+        self.ready.clear()
+        self.requests.put((self.client_id, None))
+        if not self.ready.wait(self.reply_timeout):
+            self.timed_out = True
+            raise PolicyError(f"no reply from the policy server after {self.reply_timeout:g}s")
+        if self.ring.state(self.client_id) == SLOT_ERROR:
+            # The error text comes on the response queue
+            self._reply()
+        return self.ring.read_actions(self.client_id)
@@ -0,0 +1,220 @@
+"""Compact recordings of matches: every step's TeamFrame plus our agents' actions.
+
+A Recorder fills preallocated fixed-dtype column buffers, one per frame field,
+and writes each full chunk of CHUNK_STEPS steps into a compressed .npz as
+soon as it is full, so a match never holds more than one chunk in memory.
+Positions, directions, tired factors and the ball are quantized to
+`resolution` and delta-encoded along time within a chunk (small integer
+steps compress well); every other field is kept exactly in the smallest
+integer dtype that holds it.
+
+    python recorder.py trajectories/*.npz   # steps, size and result of recordings
+"""
+import argparse
+import json
+import os
+import zipfile
+from collections import defaultdict
+
+import numpy as np
+
+from shm_transport import NUM_STICKY_ACTIONS
+from wrappers import LEFT_TEAM_FIELDS, RIGHT_TEAM_FIELDS, TeamFrame
+
+FORMAT_VERSION = 1
+CHUNK_STEPS = 512
+# Quantization step of positions and directions; float32 engine values are only ~1e-7 precise anyway
+DEFAULT_RESOLUTION = 1e-6
+
+# Continuous fields, stored as delta-encoded int32 multiples of the resolution
+QUANTIZED_FIELDS = tuple(
+    side + field for side in ('left_', 'right_') for field in ('team', 'team_direction', 'team_tired_factor')
+) + ('ball', 'ball_direction')
+
+# Column holding the absolute first row of each chunk of a delta-encoded column
+START_SUFFIX = '.start'
+
+# dtype TeamFrame uses for the exactly stored array fields, when it differs from the stored one
+_FRAME_DTYPES = {
+    'left_team_roles': np.int64,
+    'right_team_roles': np.int64,
+    'active': np.int64,
+}
+
+
+def column_layout(num_left=11, num_right=11, num_agents=11):
+    """(name, dtype, per-step shape) of every recorded column."""
+    columns = []
+    for side, num_players in (('left', num_left), ('right', num_right)):
+        columns += [
+            (f'{side}_team', np.int32, (num_players, 2)),
+            (f'{side}_team_direction', np.int32, (num_players, 2)),
+            (f'{side}_team_tired_factor', np.int32, (num_players,)),
+            (f'{side}_team_yellow_card', np.bool_, (num_players,)),
+            (f'{side}_team_active', np.bool_, (num_players,)),
+            (f'{side}_team_roles', np.int8, (num_players,)),
+        ]
+    return columns + [
+        ('ball', np.int32, (3,)),
+        ('ball_direction', np.int32, (3,)),
+        ('ball_owned_team', np.int8, ()),
+        ('ball_owned_player', np.int8, ()),
+        ('game_mode', np.int8, ()),
+        ('score', np.int16, (2,)),
+        ('steps_left', np.int16, ()),
+        ('active', np.int8, (num_agents,)),
+        ('sticky_actions', np.uint8, (num_agents, NUM_STICKY_ACTIONS)),
+        ('actions', np.int8, (num_agents,)),
+    ]
+
+
+def _narrowest_int(deltas):
+    """Smallest signed integer dtype holding every delta."""
+    low, high = int(deltas.min()), int(deltas.max())
+    for dtype in (np.int8, np.int16):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int32
+
+
+class Recorder:
+    """Writes one match to `path` (.npz), step by step.
+
+    The file is built next to `path` and moved into place by close(), so a
+    crashed match never leaves a half-written recording behind.
+    """
+
+    def __init__(self, path, resolution=DEFAULT_RESOLUTION, chunk_steps=CHUNK_STEPS):
+        self.path = path
+        self.resolution = resolution
+        self.chunk_steps = chunk_steps
+        self.buffers = None  # allocated from the first frame, whose team sizes depend on the scenario
+        self.rows = 0  # steps in the current chunk
+        self.steps = 0  # steps already flushed
+        self.chunks = 0
+        self._scale = 1 / resolution
+        self._zip = zipfile.ZipFile(path + '.tmp', 'w', zipfile.ZIP_DEFLATED)
+
+    def append(self, frame, actions):
+        """Records one step: the frame our agents saw and the actions they took."""
+        if self.buffers is None:
+            layout = column_layout(len(frame.left_team), len(frame.right_team), frame.num_agents)
+            self.buffers = {name: np.zeros((self.chunk_steps,) + shape, dtype) for name, dtype, shape in layout}
+        row = self.rows
+        for name, buffer in self.buffers.items():
+            if name in QUANTIZED_FIELDS:
+                buffer[row] = np.rint(getattr(frame, name) * self._scale)
+            elif name != 'actions':
+                buffer[row] = getattr(frame, name)
+        self.buffers['actions'][row] = actions
+        self.rows += 1
+        if self.rows == self.chunk_steps:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        for name, buffer in self.buffers.items():
+            chunk = buffer[:self.rows]
+            if name in QUANTIZED_FIELDS:
+                # 每个块单独存第一行的绝对值，其余存与上一行的差（用能装下的最窄整数类型），块可以独立解码
+                self._write(f'{name}{START_SUFFIX}/{self.chunks:05d}', chunk[0])
+                chunk = np.diff(chunk, axis=0, prepend=chunk[:1])
+                chunk = chunk.astype(_narrowest_int(chunk), copy=False)
+            self._write(f'{name}/{self.chunks:05d}', chunk)
+        self.steps += self.rows
+        self.chunks += 1
+        self.rows = 0
+
+    def _write(self, name, array):
+        with self._zip.open(name + '.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, array, allow_pickle=False)
+
+    def close(self, **meta):
+        """Flushes the last chunk and stores `meta` (e.g. the result) with the recording."""
+        if self._zip is None:
+            return
+        self._flush()
+        meta = dict(meta, format=FORMAT_VERSION, resolution=self.resolution, steps=self.steps)
+        self._write('meta', np.array(json.dumps(meta)))
+        self._zip.close()
+        self._zip = None
+        os.replace(self.path + '.tmp', self.path)
+
+
+class Trajectory:
+    """A loaded recording: decoded (steps, ...) columns and the recording's metadata.
+
+    frame(step) builds the TeamFrame of a step from views into the columns,
+    so replaying a match copies nothing per step.
+    """
+
+    def __init__(self, columns, meta):
+        self.columns = columns
+        self.meta = meta
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            chunk_keys = defaultdict(list)
+            for key in data.files:
+                name, _, chunk = key.partition('/')
+                if chunk:
+                    chunk_keys[name].append(key)
+            columns = {}
+            for name, keys in chunk_keys.items():
+                if name.endswith(START_SUFFIX):
+                    continue
+                chunks = [data[key] for key in sorted(keys)]
+                if name in QUANTIZED_FIELDS:
+                    starts = [data[key] for key in sorted(chunk_keys[name + START_SUFFIX])]
+                    # cumsum accumulates narrow integer deltas in int64
+                    columns[name] = np.concatenate([
+                        start + np.cumsum(chunk, axis=0) for start, chunk in zip(starts, chunks)
+                    ]) * meta['resolution']
+                else:
+                    columns[name] = np.concatenate(chunks).astype(_FRAME_DTYPES.get(name, chunks[0].dtype), copy=False)
+        return cls(columns, meta)
+
+    def __len__(self):
+        return self.meta['steps']
+
+    @property
+    def actions(self):
+        return self.columns['actions']
+
+    def frame(self, step):
+        columns = self.columns
+        fields = {name: columns[name][step] for name in LEFT_TEAM_FIELDS + RIGHT_TEAM_FIELDS}
+        fields.update(
+            ball=columns['ball'][step],
+            ball_direction=columns['ball_direction'][step],
+            ball_owned_team=int(columns['ball_owned_team'][step]),
+            ball_owned_player=int(columns['ball_owned_player'][step]),
+            game_mode=int(columns['game_mode'][step]),
+            score=columns['score'][step].tolist(),
+            steps_left=int(columns['steps_left'][step]),
+            active=columns['active'][step],
+            sticky_actions=columns['sticky_actions'][step],
+        )
+        return TeamFrame(**fields)
+
+    def frames(self):
+        for step in range(len(self)):
+            yield self.frame(step)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize recorded trajectories.")
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args(argv)
+    for path in args.paths:
+        trajectory = Trajectory.load(path)
+        meta = {key: value for key, value in trajectory.meta.items() if key not in ('format', 'steps')}
+        print(f"{path}: {len(trajectory)} steps, {os.path.getsize(path) / 1024:.0f} KiB, {json.dumps(meta)}")
+
+
+if __name__ == '__main__':
+    main()
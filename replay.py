@@ -0,0 +1,93 @@
+"""Offline replay: runs strategies on recorded frames, without the game engine.
+
+Frames of a recording (recorder.Trajectory) are wrapped in place with
+ObservationWrapper.from_frame and fed to any strategy as fast as it can
+decide. The replay is open loop: the frames stay the recorded ones whatever
+the strategy answers, so it shows how decisions change on known situations,
+not how the match would have gone.
+
+Replaying a recording with the strategy that played it must give back the
+recorded actions (np.random is seeded like the match was), which makes a
+quick decision regression check:
+
+    python replay.py trajectories/*.npz --check              # same decisions as recorded?
+    python replay.py trajectories/*.npz --strategy roles_6_10 --output actions.npz
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from recorder import Trajectory
+from strategies.registry import load_batch_strategy, load_strategy
+from wrappers import ObservationWrapper
+
+
+def replay_actions(trajectory, strategy=None, batch_size=None):
+    """(steps, num_agents) actions of `strategy` (default: the recorded one) on every recorded frame.
+
+    With `batch_size` the frames go through the strategy's batched form that
+    many at a time, which is faster for strategies with a native batch
+    implementation; random draws then happen in a different order than in
+    the match, so decisions that depend on them may differ.
+    """
+    strategy = strategy or trajectory.meta['strategy']
+    if trajectory.meta.get('seed') is not None:
+        np.random.seed(trajectory.meta['seed'])
+    num_agents = trajectory.actions.shape[1] if len(trajectory) else 0
+    actions = np.zeros((len(trajectory), num_agents), dtype=np.int64)
+    if batch_size:
+        policy = load_batch_strategy(strategy)
+        for first in range(0, len(trajectory), batch_size):
+            steps = range(first, min(first + batch_size, len(trajectory)))
+            actions[first:steps.stop] = policy([ObservationWrapper.from_frame(trajectory.frame(step))
+                                                for step in steps])
+    else:
+        policy = load_strategy(strategy)
+        for step, frame in enumerate(trajectory.frames()):
+            actions[step] = policy(ObservationWrapper.from_frame(frame))
+    return actions
+
+
+def diff_steps(actions, recorded):
+    """Indices of the steps where any agent's action differs."""
+    return np.flatnonzero((actions != recorded).any(axis=1))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded frames through a strategy without the engine.")
+    parser.add_argument('paths', nargs='+', help="recordings written by main.py --record")
+    parser.add_argument('--strategy', default=None,
+                        help="strategy to replay (default: the one that played each recording)")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="decide this many frames per batched policy call")
+    parser.add_argument('--check', action='store_true',
+                        help="exit with status 1 if any action differs from the recorded ones")
+    parser.add_argument('--output', default=None, help="save the replayed actions, one array per recording, to this .npz")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    replayed = {}
+    differing_files = 0
+    for path in args.paths:
+        trajectory = Trajectory.load(path)
+        start = time.perf_counter()
+        actions = replay_actions(trajectory, args.strategy, args.batch_size)
+        duration = time.perf_counter() - start
+        differing = diff_steps(actions, trajectory.actions)
+        differing_files += bool(len(differing))
+        replayed[os.path.splitext(os.path.basename(path))[0]] = actions
+        first = f", first at step {differing[0]}" if len(differing) else ""
+        print(f"{path}: {len(trajectory)} steps in {duration:.2f}s ({len(trajectory) / max(duration, 1e-9):.0f} steps/s), "
+              f"{len(differing)} steps differ from the recording{first}", flush=True)
+    if args.output:
+        np.savez_compressed(args.output, **replayed)
+    if args.check and differing_files:
+        raise SystemExit(f"{differing_files} of {len(args.paths)} recordings replayed with different actions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Append-only JSONL store of finished matches.
+
+One line per match attempt that ended, with the job it belongs to (strategy,
+strategy version, scenario, seed), its score, step count and timing. A run
+reads the store first and skips the jobs it already holds, so an interrupted
+run picks up where it stopped.
+
+    python results_store.py results.jsonl   # aggregate statistics per strategy version and scenario
+"""
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from strategies.registry import resolve_spec
+
+# Top-level modules (geometry, passing, movement, wrappers, ...) live here
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _module_file(name):
+    """Source file of a dotted module name inside the repo, or None."""
+    path = os.path.join(REPO_ROOT, *name.split('.'))
+    for candidate in (path + '.py', os.path.join(path, '__init__.py')):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _local_imports(path):
+    """Repo source files imported anywhere in `path`, including imports inside functions."""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    package = os.path.relpath(os.path.dirname(path), REPO_ROOT).split(os.sep)
+    package = [] if package == [os.curdir] else package
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            module = package[:len(package) - node.level + 1] if node.level else []
+            module += node.module.split('.') if node.module else []
+            # `from package import name` may import a submodule
+            names += ['.'.join(module)] + ['.'.join(module + [alias.name]) for alias in node.names]
+    return {file for file in map(_module_file, filter(None, names)) if file is not None}
+
+
+@lru_cache(maxsize=None)
+def strategy_version(spec):
+    """Short hash of the source the strategy decides with.
+
+    Every .py file next to the strategy's module is included, since role
+    modules import each other, and so is every repo module they import,
+    directly or not (e.g. movement.py, passing.py, geometry.py, wrappers.py);
+    editing any of them gives a new version.
+    """
+    module = importlib.import_module(resolve_spec(spec).partition(':')[0])
+    directory = os.path.dirname(os.path.abspath(module.__file__))
+    pending = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.py')]
+    files = set()
+    while pending:
+        path = pending.pop()
+        if path not in files:
+            files.add(path)
+            pending += _local_imports(path)
+    digest = hashlib.sha1()
+    for path in sorted(files):
+        digest.update(os.path.relpath(path, REPO_ROOT).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def job_id(strategy, version, profile, env_name, seed):
+    """Identifier of one match job; the same inputs always give the same id."""
+    key = json.dumps([strategy, version, profile, env_name, seed])
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class ResultsStore:
+    """A JSONL file that results are only ever appended to."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def records(self):
+        """Every stored record; a line cut short by a crash is skipped."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def completed(self):
+        """Latest successful record per job id."""
+        return {record['job_id']: record for record in self.records() if not record.get('failed')}
+
+    def append(self, record):
+        record = dict(record, recorded_at=time.time())
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def summarize(results):
+    """Aggregate win/draw/loss and goal statistics over finished matches; failed ones are only counted."""
+    failed = sum(bool(r.get('failed')) for r in results)
+    results = [r for r in results if not r.get('failed')]
+    wins = sum(r['left_reward'] > r['right_reward'] for r in results)
+    draws = sum(r['left_reward'] == r['right_reward'] for r in results)
+    goals_for = sum(r['left_reward'] for r in results)
+    goals_against = sum(r['right_reward'] for r in results)
+    return {
+        'matches': len(results),
+        'wins': wins,
+        'draws': draws,
+        'losses': len(results) - wins - draws,
+        'goals_for': goals_for,
+        'goals_against': goals_against,
+        'mean_goal_difference': (goals_for - goals_against) / len(results) if results else 0.0,
+        'failed': failed,
+    }
+
+
+def aggregate(records):
+    """summarize of the successful records, per (strategy, version, profile, env_name)."""
+    groups = defaultdict(dict)
+    for record in records:
+        key = (record['strategy'], record['strategy_version'], record['profile'], record['env_name'])
+        # Several attempts of one job: failures only count when nothing succeeded
+        if not record.get('failed') or record['job_id'] not in groups[key]:
+            groups[key][record['job_id']] = record
+    return [
+        dict(zip(('strategy', 'strategy_version', 'profile', 'env_name'), key), **summarize(list(jobs.values())))
+        for key, jobs in groups.items()
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate statistics from a results store.")
+    parser.add_argument('path', nargs='?', default='results.jsonl')
+    args = parser.parse_args(argv)
+    for row in aggregate(ResultsStore(args.path).records()):
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
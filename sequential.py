@@ -0,0 +1,189 @@
+"""Streaming match statistics and early-stopping rules for strategy evaluations.
+
+Results are fed one match at a time (from the left team's point of view) and
+a StoppingRule says when the evaluation has answered its question, so a clear
+improvement or regression does not need the full batch of matches.
+"""
+import math
+from statistics import NormalDist
+
+
+# Floor for the variance of the match score, which is 0 after a run of identical results
+MIN_SCORE_VARIANCE = 1e-2
+# Same for the goal difference: one goal of standard deviation per match, so a run of 0-0 draws
+# does not look precisely measured (ten draws still leave +/-0.6 at 95%)
+MIN_GD_VARIANCE = 1.0
+
+
+def elo_to_score(elo):
+    """Expected match score (win 1, draw 0.5, loss 0) for an Elo difference."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+class MatchStatistics:
+    """Win/draw/loss counts plus running mean and variance of score and goal difference.
+
+    Means and variances are updated with Welford's method, so each new
+    result costs O(1) and nothing is kept per match.
+    """
+
+    def __init__(self):
+        self.matches = self.wins = self.draws = self.losses = 0
+        self.goals_for = self.goals_against = 0
+        self._score_mean = self._score_m2 = 0.0
+        self._gd_mean = self._gd_m2 = 0.0
+
+    def update(self, goals_for, goals_against):
+        self.matches += 1
+        self.goals_for += goals_for
+        self.goals_against += goals_against
+        if goals_for > goals_against:
+            self.wins += 1
+            score = 1.0
+        elif goals_for == goals_against:
+            self.draws += 1
+            score = 0.5
+        else:
+            self.losses += 1
+            score = 0.0
+        delta = score - self._score_mean
+        self._score_mean += delta / self.matches
+        self._score_m2 += delta * (score - self._score_mean)
+        difference = goals_for - goals_against
+        delta = difference - self._gd_mean
+        self._gd_mean += delta / self.matches
+        self._gd_m2 += delta * (difference - self._gd_mean)
+
+    @property
+    def score(self):
+        return self._score_mean
+
+    @property
+    def score_variance(self):
+        return self._score_m2 / (self.matches - 1) if self.matches > 1 else 0.0
+
+    @property
+    def goal_difference(self):
+        return self._gd_mean
+
+    @property
+    def goal_difference_variance(self):
+        return self._gd_m2 / (self.matches - 1) if self.matches > 1 else 0.0
+
+    def win_rate_interval(self, confidence=0.95):
+        """Wilson score interval of the win rate."""
+        if not self.matches:
+            return 0.0, 1.0
+        z = _z(confidence)
+        n = self.matches
+        p = self.wins / n
+        centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return centre - half, centre + half
+
+    def score_interval(self, confidence=0.95):
+        """Normal-approximation interval of the mean match score.
+
+        The variance is floored at MIN_SCORE_VARIANCE, so a few identical
+        results do not give an interval of zero width.
+        """
+        if self.matches < 2:
+            return 0.0, 1.0
+        half = _z(confidence) * math.sqrt(max(self.score_variance, MIN_SCORE_VARIANCE) / self.matches)
+        return max(self.score - half, 0.0), min(self.score + half, 1.0)
+
+    def goal_difference_interval(self, confidence=0.95):
+        """Normal-approximation interval of the mean goal difference, its variance floored at MIN_GD_VARIANCE."""
+        if self.matches < 2:
+            return -math.inf, math.inf
+        half = _z(confidence) * math.sqrt(max(self.goal_difference_variance, MIN_GD_VARIANCE) / self.matches)
+        return self.goal_difference - half, self.goal_difference + half
+
+    def as_dict(self, confidence=0.95):
+        return {
+            'matches': self.matches,
+            'wins': self.wins,
+            'draws': self.draws,
+            'losses': self.losses,
+            'score': self.score,
+            'elo': score_to_elo(self.score) if self.matches else 0.0,
+            'win_rate_interval': self.win_rate_interval(confidence),
+            'mean_goal_difference': self.goal_difference,
+            'goal_difference_interval': self.goal_difference_interval(confidence),
+        }
+
+
+def _z(confidence):
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+class SPRT:
+    """Sequential probability ratio test of H0: elo = elo0 against H1: elo = elo1.
+
+    Uses the normal approximation of the generalized SPRT on the match score
+    (as in chess engine testing): the log-likelihood ratio grows with the
+    number of matches and the test ends when it leaves (lower, upper).
+    """
+
+    MIN_VARIANCE = MIN_SCORE_VARIANCE
+
+    def __init__(self, elo0=0.0, elo1=35.0, alpha=0.05, beta=0.05):
+        self.elo0, self.elo1 = elo0, elo1
+        self.score0, self.score1 = elo_to_score(elo0), elo_to_score(elo1)
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def llr(self, stats):
+        if not stats.matches:
+            return 0.0
+        variance = max(stats.score_variance, self.MIN_VARIANCE)
+        return (stats.matches * (self.score1 - self.score0)
+                * (2 * stats.score - self.score0 - self.score1) / (2 * variance))
+
+    def decision(self, stats):
+        """'H1' (at least elo1), 'H0' (at most elo0) or None while undecided."""
+        llr = self.llr(stats)
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+
+class StoppingRule:
+    """Stops once the SPRT decides or the goal difference is known precisely enough.
+
+    `precision` is the target half-width of the goal-difference confidence
+    interval. Nothing stops before `min_matches` results.
+    """
+
+    def __init__(self, sprt=None, precision=None, confidence=0.95, min_matches=10):
+        self.sprt = sprt
+        self.precision = precision
+        self.confidence = confidence
+        self.min_matches = min_matches
+
+    @property
+    def enabled(self):
+        return self.sprt is not None or self.precision is not None
+
+    def check(self, stats):
+        """Reason to stop, or None to keep playing."""
+        if stats.matches < self.min_matches:
+            return None
+        if self.sprt is not None:
+            decision = self.sprt.decision(stats)
+            if decision == 'H1':
+                return f"SPRT accepted elo >= {self.sprt.elo1:g} (LLR {self.sprt.llr(stats):.2f})"
+            if decision == 'H0':
+                return f"SPRT accepted elo <= {self.sprt.elo0:g} (LLR {self.sprt.llr(stats):.2f})"
+        if self.precision is not None:
+            low, high = stats.goal_difference_interval(self.confidence)
+            if (high - low) / 2 <= self.precision:
+                return f"goal difference {stats.goal_difference:+.2f} known to +/-{self.precision:g}"
+        return None
@@ -0,0 +1,149 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from wrappers import LEFT_TEAM_FIELDS, MATCH_FIELDS, RIGHT_TEAM_FIELDS, TeamFrame
+
+NUM_STICKY_ACTIONS = 10
+
+# Slot states
+SLOT_EMPTY = 0
+SLOT_OBSERVATION = 1  # written by the simulator worker, waiting for actions
+SLOT_ACTIONS = 2  # actions written by the policy side
+SLOT_ERROR = 3  # the policy side failed on this slot's step
+
+
+def frame_dtype(num_players=11, num_agents=11):
+    """Fixed layout of one slot: a full TeamFrame plus the agents' action slots.
+
+    `num_players` and `num_agents` are capacities; the counts of the step in a
+    slot are stored with it and only that many entries are valid.
+    """
+    def team(side):
+        return [
+            (f'{side}_team', np.float64, (num_players, 2)),
+            (f'{side}_team_direction', np.float64, (num_players, 2)),
+            (f'{side}_team_tired_factor', np.float64, (num_players,)),
+            (f'{side}_team_yellow_card', np.bool_, (num_players,)),
+            (f'{side}_team_active', np.bool_, (num_players,)),
+            (f'{side}_team_roles', np.int64, (num_players,)),
+        ]
+    return np.dtype(team('left') + team('right') + [
+        ('ball', np.float64, (3,)),
+        ('ball_direction', np.float64, (3,)),
+        ('ball_owned_team', np.int64),
+        ('ball_owned_player', np.int64),
+        ('game_mode', np.int64),
+        ('score', np.int64, (2,)),
+        ('steps_left', np.int64),
+        ('active', np.int64, (num_agents,)),
+        ('sticky_actions', np.uint8, (num_agents, NUM_STICKY_ACTIONS)),
+        ('actions', np.int64, (num_agents,)),
+        ('num_left', np.int64),
+        ('num_right', np.int64),
+        ('num_agents', np.int64),
+        ('state', np.int64),
+    ], align=True)
+
+
+class SharedFrameRing:
+    """Per-environment frame slots in one multiprocessing.shared_memory block.
+
+    A simulator worker owns one slot: it copies its raw observations in with
+    write_observations and reads its actions back with read_actions. The
+    policy side wraps a slot in place with frame(slot), whose arrays are views
+    into shared memory, and answers with write_actions. Notification (which
+    slot is ready) is left to the caller, e.g. a queue of slot indices.
+    A slot holds up to `num_players` players a side and `num_agents` agents;
+    smaller steps (academy scenarios) fit, larger ones are refused.
+
+    The creating process owns the block and must call unlink() when done;
+    other processes get their own mapping when the ring is pickled to them.
+    """
+
+    def __init__(self, shm, num_slots, num_players, num_agents, owner):
+        self.shm = shm
+        self.num_slots = num_slots
+        self.num_players = num_players
+        self.num_agents = num_agents
+        self.owner = owner
+        self.slots = np.ndarray((num_slots,), dtype=frame_dtype(num_players, num_agents), buffer=shm.buf)
+
+    @classmethod
+    def create(cls, num_slots, num_players=11, num_agents=11):
+        size = num_slots * frame_dtype(num_players, num_agents).itemsize
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), num_slots, num_players, num_agents, owner=True)
+        ring.slots['state'] = SLOT_EMPTY
+        return ring
+
+    @classmethod
+    def attach(cls, name, num_slots, num_players, num_agents):
+        return cls(shared_memory.SharedMemory(name=name), num_slots, num_players, num_agents, owner=False)
+
+    def __reduce__(self):
+        return SharedFrameRing.attach, (self.shm.name, self.num_slots, self.num_players, self.num_agents)
+
+    def write_observations(self, slot, observations):
+        """Copies one step's raw observation dicts (one per agent) into a slot."""
+        slots = self.slots
+        shared = observations[0]
+        num_left, num_right = len(shared['left_team']), len(shared['right_team'])
+        if len(observations) > self.num_agents or max(num_left, num_right) > self.num_players:
+            raise ValueError(f"step with {len(observations)} agents and {num_left}v{num_right} players does not fit "
+                             f"a ring of {self.num_agents} agents and {self.num_players} players a side")
+        for name in LEFT_TEAM_FIELDS:
+            slots[name][slot, :num_left] = shared[name]
+        for name in RIGHT_TEAM_FIELDS:
+            slots[name][slot, :num_right] = shared[name]
+        for name in MATCH_FIELDS:
+            slots[name][slot] = shared[name]
+        for agent, observation in enumerate(observations):
+            slots['active'][slot, agent] = observation['active']
+            slots['sticky_actions'][slot, agent] = observation['sticky_actions']
+        slots['num_left'][slot] = num_left
+        slots['num_right'][slot] = num_right
+        slots['num_agents'][slot] = len(observations)
+        slots['state'][slot] = SLOT_OBSERVATION
+
+    def frame(self, slot):
+        """TeamFrame whose arrays are views into the slot (no copy)."""
+        slots = self.slots
+        num_left, num_right, num_agents = (int(slots[name][slot]) for name in ('num_left', 'num_right', 'num_agents'))
+        fields = {name: slots[name][slot, :num_left] for name in LEFT_TEAM_FIELDS}
+        fields.update((name, slots[name][slot, :num_right]) for name in RIGHT_TEAM_FIELDS)
+        fields.update(
+            ball=slots['ball'][slot],
+            ball_direction=slots['ball_direction'][slot],
+            ball_owned_team=int(slots['ball_owned_team'][slot]),
+            ball_owned_player=int(slots['ball_owned_player'][slot]),
+            game_mode=int(slots['game_mode'][slot]),
+            score=slots['score'][slot],
+            steps_left=int(slots['steps_left'][slot]),
+            active=slots['active'][slot, :num_agents],
+            sticky_actions=slots['sticky_actions'][slot, :num_agents],
+        )
+        return TeamFrame(**fields)
+
+    def write_actions(self, slot, actions):
+        self.slots['actions'][slot, :self.slots['num_agents'][slot]] = actions
+        self.slots['state'][slot] = SLOT_ACTIONS
+
+    def write_error(self, slot):
+        self.slots['state'][slot] = SLOT_ERROR
+
+    def state(self, slot):
+        return int(self.slots['state'][slot])
+
+    def read_actions(self, slot):
+        self.slots['state'][slot] = SLOT_EMPTY
+        return self.slots['actions'][slot, :self.slots['num_agents'][slot]].tolist()
+
+    def close(self):
+        # Drop the numpy view first, the buffer cannot be released while exported
+        self.slots = None
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        if self.owner:
+            self.shm.unlink()
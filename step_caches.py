@@ -0,0 +1,29 @@
+"""Per-step cached properties whose build time can be observed.
+
+step_cache is functools.cached_property that, while `hook` is set, reports
+how long each build took. Only outermost builds are reported, so a cache
+built while building another one (geometry inside the pass evaluator) is not
+counted twice. strategies.profiling sets the hook to charge the shared caches
+to a row of their own instead of to the role function that touched them first.
+"""
+import time
+from functools import cached_property
+
+# hook(ns) after each outermost build; set by strategies.profiling.enable(), None costs one check per build
+hook = None
+_depth = 0
+
+
+class step_cache(cached_property):
+    def __get__(self, instance, owner=None):
+        global _depth
+        if hook is None or instance is None:
+            return super().__get__(instance, owner)
+        _depth += 1
+        start = time.perf_counter_ns()
+        try:
+            return super().__get__(instance, owner)
+        finally:
+            _depth -= 1
+            if not _depth:
+                hook(time.perf_counter_ns() - start)
@@ -0,0 +1,86 @@
+"""Wall-time breakdown of run_match steps.
+
+Each step is split into observation wrapper construction, the policy, the
+engine step (ActionWrapper.step) and bookkeeping (rewards, limits, loop),
+so it is clear which of them a match spends its time in.
+"""
+import numpy as np
+
+# Phases of one run_match step, in the order they happen
+PHASES = ('wrapper', 'policy', 'engine', 'bookkeeping')
+PERCENTILES = (50, 95, 99)
+
+
+class StepTimer:
+    """Per-step wall time of each phase of a match, in a preallocated int64 array (ns).
+
+    record() takes the timestamps of one step; the bookkeeping time of a step
+    runs from its engine step to the start of the next one (or to finish()).
+    """
+
+    def __init__(self, capacity=3001):
+        self.samples = np.zeros((capacity, len(PHASES)), dtype=np.int64)
+        self.steps = 0
+        self._stepped = None
+
+    def record(self, started, wrapped, decided, stepped):
+        if self._stepped is not None:
+            self.samples[self.steps - 1, 3] = started - self._stepped
+        if self.steps == len(self.samples):
+            self.samples = np.concatenate([self.samples, np.zeros_like(self.samples)])
+        self.samples[self.steps, :3] = (wrapped - started, decided - wrapped, stepped - decided)
+        self.steps += 1
+        self._stepped = stepped
+
+    def finish(self, now):
+        if self._stepped is not None:
+            self.samples[self.steps - 1, 3] = now - self._stepped
+            self._stepped = None
+
+    def summary(self):
+        """Per phase: total seconds, share of the step time, mean and percentiles in ms."""
+        samples = self.samples[:self.steps] / 1e6
+        totals = samples.sum(axis=0)
+        grand_total = totals.sum() or 1.0
+        summary = {'steps': self.steps}
+        for i, phase in enumerate(PHASES):
+            column = samples[:, i]
+            phase_summary = {
+                'total_s': float(totals[i] / 1e3),
+                'share': float(totals[i] / grand_total),
+                'mean_ms': float(column.mean()) if self.steps else 0.0,
+            }
+            if self.steps:
+                for q, value in zip(PERCENTILES, np.percentile(column, PERCENTILES)):
+                    phase_summary[f'p{q}_ms'] = float(value)
+            summary[phase] = phase_summary
+        return summary
+
+
+def merge_summaries(summaries):
+    """Run-level view of per-match summaries: summed totals and shares, median per-match percentiles."""
+    summaries = [summary for summary in summaries if summary and summary['steps']]
+    if not summaries:
+        return None
+    totals = {phase: sum(summary[phase]['total_s'] for summary in summaries) for phase in PHASES}
+    grand_total = sum(totals.values()) or 1.0
+    steps = sum(summary['steps'] for summary in summaries)
+    merged = {'matches': len(summaries), 'steps': steps}
+    for phase in PHASES:
+        merged[phase] = {
+            'total_s': totals[phase],
+            'share': totals[phase] / grand_total,
+            'mean_ms': totals[phase] * 1e3 / steps,
+        }
+        for q in PERCENTILES:
+            merged[phase][f'median_p{q}_ms'] = float(np.median([summary[phase][f'p{q}_ms'] for summary in summaries]))
+    return merged
+
+
+def format_summary(merged):
+    lines = [f"{'phase':<12} {'share':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    for phase in PHASES:
+        row = merged[phase]
+        lines.append(f"{phase:<12} {row['share']:>6.1%} {row['mean_ms']:>8.3f} {row['median_p50_ms']:>8.3f} "
+                     f"{row['median_p95_ms']:>8.3f} {row['median_p99_ms']:>8.3f}")
+    return '\n'.join(lines)
@@ -1,6 +1,8 @@
 import math
 import numpy as np
 
+from movement import move_action
+
 # Action constants from observation.md
 ACTION_IDLE = 0
 ACTION_LEFT = 1
@@ -22,6 +24,18 @@ ACTION_SLIDING = 16
 ACTION_DRIBBLE = 17
 ACTION_RELEASE_DRIBBLE = 18
 
+# Role constants
+ROLE_GK = 0
+ROLE_CB = 1
+ROLE_LB = 2
+ROLE_RB = 3
+ROLE_DM = 4
+ROLE_CM = 5
+ROLE_LM = 6
+ROLE_RM = 7
+ROLE_AM = 8
+ROLE_CF = 9
+
 # GameMode constants
 GAME_MODE_NORMAL = 0
 GAME_MODE_KICKOFF = 1
@@ -51,25 +65,7 @@ def get_my_pos(obs):
 
 def move_towards(my_pos, target_pos):
     """Returns a discrete move action to get closer to target_pos."""
-    my_pos = np.array(my_pos)
-    target_pos = np.array(target_pos)
-    direction = target_pos - my_pos
-    
-    if np.linalg.norm(direction) < 0.03:
-        return ACTION_IDLE
-
-    if abs(direction[0]) > 2 * abs(direction[1]):
-        if direction[0] > 0: return ACTION_RIGHT
-        else: return ACTION_LEFT
-    elif abs(direction[1]) > 2 * abs(direction[0]):
-        if direction[1] > 0: return ACTION_BOTTOM
-        else: return ACTION_TOP
-    else:
-        if direction[0] > 0 and direction[1] > 0: return ACTION_BOTTOM_RIGHT
-        elif direction[0] > 0 and direction[1] < 0: return ACTION_TOP_RIGHT
-        elif direction[0] < 0 and direction[1] > 0: return ACTION_BOTTOM_LEFT
-        elif direction[0] < 0 and direction[1] < 0: return ACTION_TOP_LEFT
-        else: return ACTION_IDLE
+    return move_action(my_pos, target_pos)
 
 def find_open_teammate(obs, min_dist_from_opp=0.1):
     """Finds the best teammate to pass to."""
@@ -427,4 +423,17 @@ def central_forward_actions(obs):
         else:
             return move_towards(my_pos, [0.5, 0])
             
-    return ACTION_IDLE
\ No newline at end of file
+    return ACTION_IDLE
+
+player_role_to_action = {
+    ROLE_GK: goalkeeper_actions,
+    ROLE_CB: centre_back_actions,
+    ROLE_LB: left_back_actions,
+    ROLE_RB: right_back_actions,
+    ROLE_DM: defence_midfielder_actions,
+    ROLE_CM: central_midfielder_actions,
+    ROLE_LM: left_midfielder_actions,
+    ROLE_RM: right_midfielder_actions,
+    ROLE_AM: attack_midfielder_actions,
+    ROLE_CF: central_forward_actions,
+}
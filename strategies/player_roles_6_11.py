@@ -332,6 +332,9 @@
 import math
 import numpy as np
 
+from movement import move_action
+from .tactical_context import get_tactical_context
+
 # =====================================================================
 #  Constants provided by the environment (from observation.md)
 # =====================================================================
@@ -394,74 +397,23 @@ MY_GOAL_X = -1.0
 
 def get_global_tactic(obs):
     """Determines the overall team strategy based on score and time."""
-    my_score, opponent_score = obs.score
-    steps_left = obs.steps_left
-    total_steps = 3000  # Default total steps in a match
-
-    if my_score > opponent_score and steps_left < total_steps * 0.15:
-        return "PROTECT_LEAD"
-    if my_score < opponent_score and steps_left < total_steps * 0.20:
-        return "ALL_OUT_ATTACK"
-    return "NORMAL"
+    return get_tactical_context(obs.wrapper).global_tactic
 
 def move_towards(my_pos, target_pos):
     """Returns a discrete move action to get closer to target_pos."""
-    my_pos = np.array(my_pos)
-    target_pos = np.array(target_pos)
-    direction = target_pos - my_pos
-    
-    if np.linalg.norm(direction) < 0.03:
-        return ACTION_IDLE
-
-    # Determine the primary direction of movement
-    if abs(direction[0]) > 2 * abs(direction[1]):
-        return ACTION_RIGHT if direction[0] > 0 else ACTION_LEFT
-    elif abs(direction[1]) > 2 * abs(direction[0]):
-        return ACTION_BOTTOM if direction[1] > 0 else ACTION_TOP
-    else: # Diagonal movement
-        if direction[0] > 0 and direction[1] > 0: return ACTION_BOTTOM_RIGHT
-        elif direction[0] > 0 and direction[1] < 0: return ACTION_TOP_RIGHT
-        elif direction[0] < 0 and direction[1] > 0: return ACTION_BOTTOM_LEFT
-        else: return ACTION_TOP_LEFT
+    return move_action(my_pos, target_pos)
 
 def is_under_pressure(obs, radius=0.1):
     """Checks if any opponent is within a given radius of the active player."""
-    my_pos = obs.player_position
-    for opp_pos in obs.right_team_positions:
-        if obs.compute_distance(my_pos, opp_pos) < radius:
-            return True
-    return False
+    return get_tactical_context(obs.wrapper).is_under_pressure(obs.active_player, radius)
 
-def find_best_teammate_to_pass(obs, roles=None, min_dist_from_opp=0.1):
+def find_best_teammate_to_pass(obs, roles=None, min_dist_from_opp=0.1, lane_weight=0.0):
     """Finds the best teammate to pass to, who is open and optionally in a specific role."""
-    my_pos = obs.player_position
-    best_teammate_idx = -1
-    max_score = -1e9
-
-    for i, teammate_pos in enumerate(obs.left_team_positions):
-        # Skip self or inactive players
-        if i == obs.active_player or not obs.observation['left_team_active'][i]:
-            continue
-        
-        # Filter by role if specified
-        if roles and obs.observation['left_team_roles'][i] not in roles:
-            continue
-
-        # Check how open the teammate is
-        closest_opp_dist = min([obs.compute_distance(teammate_pos, opp_pos) for opp_pos in obs.right_team_positions])
-        
-        if closest_opp_dist < min_dist_from_opp:
-            continue
-        
-        # Scoring: prioritize open, forward teammates
-        # More open is better, more forward is better, not too far is better
-        score = closest_opp_dist * 5 + teammate_pos[0] * 2 - obs.compute_distance(my_pos, teammate_pos)
-        
-        if score > max_score:
-            max_score = score
-            best_teammate_idx = i
-            
-    return best_teammate_idx
+    # Scoring: prioritize open, forward teammates
+    # More open is better, more forward is better, not too far is better.
+    # A lane_weight > 0 also rewards passing lanes far from any opponent.
+    mask = obs.wrapper.left_roles.mask(roles) if roles else None
+    return obs.wrapper.pass_evaluator.best(obs.active_player, mask, min_dist_from_opp, lane_weight)
 
 # =====================================================================
 #  Role-Specific Action Implementations
@@ -473,8 +425,8 @@ def goalkeeper_actions(obs):
         global_tactic = get_global_tactic(obs)
         
         # Check if defenders are under high pressure
-        is_pressure = any(is_under_pressure(p_obs, radius=0.15) for p_obs in obs.wrapper.player_observations 
-                          if p_obs.player_role in [ROLE_CB, ROLE_LB, ROLE_RB])
+        defenders = obs.wrapper.left_roles.mask([ROLE_CB, ROLE_LB, ROLE_RB])
+        is_pressure = get_tactical_context(obs.wrapper).any_under_pressure(defenders, radius=0.15)
         
         # TACTIC: Long pass to bypass opponent's press
         if is_pressure or global_tactic == "ALL_OUT_ATTACK":
@@ -545,7 +497,7 @@ def left_back_actions(obs):
 
     # TACTIC: Overlapping run
     # Find the left midfielder
-    lm_obs = next((p for p in obs.wrapper.player_observations if p.player_role == ROLE_LM), None)
+    lm_obs = obs.wrapper.player_with_role(ROLE_LM)
     if lm_obs and lm_obs.is_ball_owned_by_player():
         # If LM is moving inward (direction.y > 0 for left side), sprint forward
         if lm_obs.player_direction[1] > 0.01:
@@ -571,7 +523,7 @@ def right_back_actions(obs):
         return ACTION_SHORT_PASS
 
     # TACTIC: Overlapping run
-    rm_obs = next((p for p in obs.wrapper.player_observations if p.player_role == ROLE_RM), None)
+    rm_obs = obs.wrapper.player_with_role(ROLE_RM)
     if rm_obs and rm_obs.is_ball_owned_by_player():
         if rm_obs.player_direction[1] < -0.01: # RM moving inward
             if not obs.sticky_actions[STICKY_SPRINT]: return ACTION_SPRINT
@@ -591,8 +543,7 @@ def defence_midfielder_actions(obs):
     my_pos = obs.player_position
     if obs.is_ball_owned_by_player():
         # TACTIC: Switch play to the other flank if one side is congested
-        player_count_left = sum(1 for p in obs.left_team_positions if p[1] < 0) + sum(1 for p in obs.right_team_positions if p[1] < 0)
-        player_count_right = sum(1 for p in obs.left_team_positions if p[1] > 0) + sum(1 for p in obs.right_team_positions if p[1] > 0)
+        player_count_left, player_count_right = get_tactical_context(obs.wrapper).flank_congestion
         
         if my_pos[1] < 0 and player_count_left > 10: # Congested left
             target_idx = find_best_teammate_to_pass(obs, roles=[ROLE_RM])
@@ -613,10 +564,10 @@ def defence_midfielder_actions(obs):
 
     # TACTIC: Cut passing lanes
     if obs.ball_owned_team == 1:
-        ball_carrier_pos = obs.right_team_positions[obs.ball_owned_player]
+        context = get_tactical_context(obs.wrapper)
+        ball_carrier_pos = context.ball_carrier_position
         # Find opponent closest to our goal (most dangerous)
-        opp_dists_to_goal = [p[0] for p in obs.right_team_positions]
-        most_dangerous_opp_pos = obs.right_team_positions[np.argmin(opp_dists_to_goal)]
+        most_dangerous_opp_pos = obs.right_team_positions[context.most_dangerous_opponent]
         # Position between them
         intercept_pos = (np.array(ball_carrier_pos) + np.array(most_dangerous_opp_pos)) / 2
         return move_towards(my_pos, intercept_pos)
@@ -695,7 +646,7 @@ def attack_midfielder_actions(obs):
     if obs.is_ball_owned_by_player():
         if my_pos[0] > 0.6: return ACTION_SHOT
         # TACTIC: Through ball to CF
-        cf_obs = next((p for p in obs.wrapper.player_observations if p.player_role == ROLE_CF), None)
+        cf_obs = obs.wrapper.player_with_role(ROLE_CF)
         if cf_obs:
             # Pass into space in front of the CF
             target_pos = np.array(cf_obs.player_position) + np.array(cf_obs.player_direction) * 5
@@ -703,7 +654,7 @@ def attack_midfielder_actions(obs):
         return ACTION_LONG_PASS
 
     # TACTIC: Give-and-go
-    cf_obs = next((p for p in obs.wrapper.player_observations if p.player_role == ROLE_CF), None)
+    cf_obs = obs.wrapper.player_with_role(ROLE_CF)
     if cf_obs and cf_obs.is_ball_owned_by_player():
         if not obs.sticky_actions[STICKY_SPRINT]: return ACTION_SPRINT
         return move_towards(my_pos, (OPPONENT_GOAL_X, 0.0))
@@ -0,0 +1,51 @@
+# strategies/registry.py
+import importlib
+from functools import lru_cache, partial
+
+import numpy as np
+
+from .advanced_strategy import dispatch_roles
+
+DEFAULT_STRATEGY = 'strategies.advanced_strategy:advanced_strategy'
+
+# Short names for the playable strategy revisions (player_roles_temp is only a template)
+STRATEGIES = {
+    'advanced': DEFAULT_STRATEGY,
+    'batched': 'strategies.batched_strategy:batched_strategy',
+    'roles_6_11': 'strategies.player_roles_6_11',
+    'roles_6_10': 'strategies.player_roles_6_10',
+}
+
+def resolve_spec(spec):
+    """Spec behind a registered name; other specs are returned unchanged."""
+    return STRATEGIES.get(spec, spec)
+
+@lru_cache(maxsize=None)
+def load_strategy(spec=DEFAULT_STRATEGY):
+    """Resolves a strategy spec to a callable taking an ObservationWrapper.
+
+    `spec` is a name from STRATEGIES, "module:function" or the name of a role
+    module exposing `player_role_to_action` (e.g. "strategies.player_roles_6_11"),
+    which is dispatched per player like advanced_strategy.
+    """
+    module_name, _, attribute = resolve_spec(spec).partition(':')
+    module = importlib.import_module(module_name)
+    if attribute:
+        return getattr(module, attribute)
+    if hasattr(module, 'player_role_to_action'):
+        return partial(dispatch_roles, role_to_action=module.player_role_to_action)
+    raise ValueError(f"Strategy module {module_name!r} has no player_role_to_action; use 'module:function'")
+
+@lru_cache(maxsize=None)
+def load_batch_strategy(spec=DEFAULT_STRATEGY):
+    """Like load_strategy, but the callable takes a list of K ObservationWrappers
+    (one per match) and returns a (K, num_agents) action array.
+
+    Strategies with a native batched form expose it as a `batch` attribute;
+    others are called once per match.
+    """
+    policy = load_strategy(spec)
+    batch = getattr(policy, 'batch', None)
+    if batch is not None:
+        return batch
+    return lambda obs_wrappers: np.array([policy(obs_wrapper) for obs_wrapper in obs_wrappers])
@@ -0,0 +1,82 @@
+# strategies/tactical_context.py
+import numpy as np
+
+from step_caches import step_cache
+
+TOTAL_STEPS = 3000  # Default total steps in a match
+OUTFIELD_ROLES_START = 1  # Every role except the goalkeeper (0)
+
+
+class TacticalContext:
+    """Team-level facts shared by every role function during one step.
+
+    Each item is computed on first access and memoized, so items no role
+    asks for in a given step cost nothing. Positions are from the left
+    team's point of view (attacking towards x = 1).
+    """
+
+    def __init__(self, obs_wrapper):
+        self.wrapper = obs_wrapper
+        self.frame = obs_wrapper.frame
+
+    @step_cache
+    def global_tactic(self):
+        """Overall team strategy based on score and time."""
+        my_score, opponent_score = self.frame.score
+        steps_left = self.frame.steps_left
+
+        if my_score > opponent_score and steps_left < TOTAL_STEPS * 0.15:
+            return "PROTECT_LEAD"
+        if my_score < opponent_score and steps_left < TOTAL_STEPS * 0.20:
+            return "ALL_OUT_ATTACK"
+        return "NORMAL"
+
+    @step_cache
+    def pressure(self):
+        """Distance from every left team player to the closest opponent."""
+        return self.wrapper.geometry.closest_opponent_distances
+
+    def is_under_pressure(self, player, radius):
+        return bool(self.pressure[player] < radius)
+
+    def any_under_pressure(self, mask, radius):
+        """Whether any player selected by the boolean mask is under pressure."""
+        return bool((self.pressure[mask] < radius).any())
+
+    @step_cache
+    def flank_congestion(self):
+        """Players of both teams on the y < 0 and y > 0 halves of the pitch."""
+        y = np.concatenate([self.frame.left_team[:, 1], self.frame.right_team[:, 1]])
+        return int((y < 0).sum()), int((y > 0).sum())
+
+    @step_cache
+    def most_dangerous_opponent(self):
+        """Index of the opponent closest to our goal line."""
+        return int(np.argmin(self.frame.right_team[:, 0]))
+
+    @step_cache
+    def ball_carrier_position(self):
+        """Position of the player owning the ball, or None if the ball is free."""
+        if self.frame.ball_owned_team == 0:
+            return self.frame.left_team[self.frame.ball_owned_player]
+        if self.frame.ball_owned_team == 1:
+            return self.frame.right_team[self.frame.ball_owned_player]
+        return None
+
+    @step_cache
+    def defensive_lines(self):
+        """x of our deepest outfield player and of the opponents' deepest outfield player."""
+        frame = self.frame
+        our_line = frame.left_team[frame.left_team_active & (frame.left_team_roles >= OUTFIELD_ROLES_START), 0]
+        their_line = frame.right_team[frame.right_team_active & (frame.right_team_roles >= OUTFIELD_ROLES_START), 0]
+        return (float(our_line.min()) if len(our_line) else -1.0,
+                float(their_line.max()) if len(their_line) else 1.0)
+
+
+def get_tactical_context(obs_wrapper):
+    """The step's TacticalContext, created on the first request."""
+    try:
+        return obs_wrapper.tactical_context
+    except AttributeError:
+        obs_wrapper.tactical_context = TacticalContext(obs_wrapper)
+        return obs_wrapper.tactical_context
@@ -0,0 +1,141 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class TaskTimeout(Exception):
+    """A task ran past the supervisor's hard deadline and its worker was killed."""
+
+
+def worker_rss_mb(pid):
+    """Resident memory of a process in MiB, or None where /proc is not available."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def kill_pool(executor):
+    """Stops a ProcessPoolExecutor even while tasks are running.
+
+    A running task cannot be cancelled, so the worker processes are killed
+    first; this is the only way out of a hung engine.
+    """
+    for process in list(executor._processes.values()):
+        process.kill()
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def supervise(tasks, pool, workers, retries=1, task_timeout=None, max_worker_memory_mb=None, permanent=()):
+    """Runs `(key, fn)` tasks on a rebuildable process pool and yields `(key, result, error, attempts)`.
+
+    `pool.start()` returns a fresh executor and `pool.stop(kill)` tears it
+    down. At most `workers` tasks are in flight, so a task's submission time is
+    its start time and `task_timeout` (seconds) can be enforced from here.
+    `tasks` may be a generator: it is only advanced when a worker is free, so
+    it can pick the next task from the results yielded so far, and it may
+    yield None for "nothing to submit until more results are in".
+
+    A task that raises, dies with its worker or runs past `task_timeout` is
+    retried up to `retries` times, then yielded with result None and the
+    error text; a task raising one of the `permanent` exception types would
+    raise it again, so it is yielded at once. A crash or hang takes the whole pool down: it is rebuilt and
+    the other tasks that were in flight are resubmitted without using up a
+    retry. Which task crashed the pool is unknown when several were running,
+    so after such a crash each of them is rerun alone first, and only a task
+    that crashes while running alone is charged for it. When a worker grows
+    past `max_worker_memory_mb` the pool is drained and rebuilt.
+    """
+    tasks = iter(tasks)
+    queue = deque()  # tasks to retry: (key, fn, attempts so far, run alone)
+    running = {}  # future -> (key, fn, attempts, started, alone)
+    executor = None  # (re)started on demand
+    draining = False
+    try:
+        while True:
+            while not draining and len(running) < workers:
+                # A crash suspect runs with nothing else in flight
+                if any(alone for *_, alone in running.values()):
+                    break
+                if queue:
+                    if queue[0][3] and running:
+                        break
+                    key, fn, attempts, alone = queue.popleft()
+                else:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    (key, fn), attempts, alone = task, 0, False
+                if executor is None:
+                    executor = pool.start()
+                running[executor.submit(fn)] = (key, fn, attempts + 1, time.monotonic(), alone)
+            if not running:
+                if draining:
+                    pool.stop(kill=False)
+                    executor = None
+                    draining = False
+                    continue
+                break
+
+            timeout = None
+            if task_timeout is not None:
+                oldest = min(started for _, _, _, started, _ in running.values())
+                timeout = max(oldest + task_timeout - time.monotonic(), 0)
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            failed = []
+            crashed = []  # tasks lost with a crashed pool
+            for future in done:
+                key, fn, attempts, _, alone = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield key, future.result(), None, attempts
+                elif isinstance(error, BrokenProcessPool):
+                    crashed.append((key, fn, attempts, alone))
+                else:
+                    failed.append((key, fn, attempts, alone, error))
+
+            now = time.monotonic()
+            hung = [future for future, (_, _, _, started, _) in running.items()
+                    if task_timeout is not None and now - started > task_timeout]
+            for future in hung:
+                key, fn, attempts, _, alone = running.pop(future)
+                failed.append((key, fn, attempts, alone, TaskTimeout(f"no result after {task_timeout:g}s")))
+
+            if crashed or hung:
+                # The pool is unusable (or must be killed): whatever else was in flight goes with it
+                if crashed:
+                    crashed += [(key, fn, attempts, alone) for key, fn, attempts, _, alone in running.values()]
+                else:
+                    for key, fn, attempts, _, alone in running.values():
+                        queue.appendleft((key, fn, attempts - 1, alone))
+                running.clear()
+                pool.stop(kill=True)
+                executor = None
+                draining = False
+
+            if len(crashed) == 1:
+                # It was the only task running, so it is the culprit
+                key, fn, attempts, _ = crashed[0]
+                failed.append((key, fn, attempts, True, BrokenProcessPool("worker process crashed")))
+            else:
+                # Culprit unknown: rerun every suspect alone, without using up a retry
+                for key, fn, attempts, _ in reversed(crashed):
+                    queue.appendleft((key, fn, attempts - 1, True))
+
+            for key, fn, attempts, alone, error in failed:
+                if attempts <= retries and not isinstance(error, permanent):
+                    queue.append((key, fn, attempts, alone))
+                else:
+                    yield key, None, f'{type(error).__name__}: {error}', attempts
+
+            if max_worker_memory_mb is not None and executor is not None and not draining:
+                rss = [worker_rss_mb(pid) for pid in list(executor._processes)]
+                draining = any(mb is not None and mb > max_worker_memory_mb for mb in rss)
+    finally:
+        pool.stop(kill=bool(running))
@@ -0,0 +1,232 @@
+"""Head-to-head tournaments between registered strategies.
+
+Both teams are played by our agents (env profile 'head_to_head'), so any two
+strategies can meet directly. Instead of a fixed round robin, every free
+worker gets the pairing whose result is least settled: pairs are played until
+the confidence interval of their match score leaves 0.5 (one side is better)
+or gets narrower than --precision (they are even). Elo ratings are updated
+after every match and pairs next to each other in the ranking get priority,
+since those decide the order.
+
+    python tournament.py roles_6_11 roles_6_10 strategies.my_candidate --max-matches 200
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from env_setup import ENV_PROFILES, controls_both_teams
+from main import StepLimitExceeded, init_worker, run_match
+from sequential import MatchStatistics, score_to_elo
+from strategies.registry import load_strategy
+from supervisor import kill_pool, supervise
+
+INITIAL_RATING = 1500.0
+ELO_K = 16.0
+ADJACENT_WEIGHT = 2.0  # priority boost for pairs next to each other in the ranking
+
+
+class Tournament:
+    """Pair statistics, ratings and the adaptive choice of the next pairing.
+
+    Pair statistics are kept from the point of view of the first strategy
+    of the pair (in `names` order), whichever side it played on.
+    """
+
+    def __init__(self, names, confidence=0.95, precision=0.05, min_matches=4):
+        self.names = list(names)
+        self.confidence = confidence
+        self.precision = precision
+        self.min_matches = min_matches
+        self.ratings = {name: INITIAL_RATING for name in self.names}
+        self.pairs = {pair: MatchStatistics() for pair in itertools.combinations(self.names, 2)}
+        self.in_flight = {pair: 0 for pair in self.pairs}
+        self.scheduled = {pair: 0 for pair in self.pairs}
+
+    def _pair(self, a, b):
+        return (a, b) if (a, b) in self.pairs else (b, a)
+
+    def decided(self, pair):
+        stats = self.pairs[pair]
+        if stats.matches < self.min_matches:
+            return False
+        low, high = stats.score_interval(self.confidence)
+        return low > 0.5 or high < 0.5 or (high - low) / 2 <= self.precision
+
+    def ranking(self):
+        return sorted(self.names, key=self.ratings.get, reverse=True)
+
+    def next_pairing(self):
+        """(left, right) for the next match, or None if no pair needs one right now."""
+        ranking = self.ranking()
+        adjacent = {self._pair(a, b) for a, b in zip(ranking, ranking[1:])}
+        best, best_priority = None, 0.0
+        for pair, stats in self.pairs.items():
+            if self.decided(pair):
+                continue
+            planned = stats.matches + self.in_flight[pair]
+            if planned < self.min_matches:
+                priority = math.inf
+            else:
+                low, high = stats.score_interval(self.confidence)
+                priority = (high - low) / 2 / (1 + self.in_flight[pair])
+                if pair in adjacent:
+                    priority *= ADJACENT_WEIGHT
+            if best is None or priority > best_priority or (priority == best_priority and planned < best[1]):
+                best, best_priority = (pair, planned), priority
+        if best is None:
+            return None
+        pair = best[0]
+        # Alternate sides so that a side advantage cancels out
+        return pair if self.scheduled[pair] % 2 == 0 else pair[::-1]
+
+    def start(self, left, right):
+        pair = self._pair(left, right)
+        self.in_flight[pair] += 1
+        self.scheduled[pair] += 1
+
+    def cancel(self, left, right):
+        self.in_flight[self._pair(left, right)] -= 1
+
+    def record(self, left, right, left_goals, right_goals):
+        pair = self._pair(left, right)
+        self.in_flight[pair] -= 1
+        first_goals, second_goals = (left_goals, right_goals) if pair[0] == left else (right_goals, left_goals)
+        self.pairs[pair].update(first_goals, second_goals)
+
+        # Incremental Elo update
+        score = 1.0 if left_goals > right_goals else 0.5 if left_goals == right_goals else 0.0
+        expected = 1 / (1 + 10 ** ((self.ratings[right] - self.ratings[left]) / 400))
+        self.ratings[left] += ELO_K * (score - expected)
+        self.ratings[right] -= ELO_K * (score - expected)
+
+    def standings(self):
+        return [
+            {
+                'strategy': name,
+                'rating': self.ratings[name],
+                'matches': sum(stats.matches for pair, stats in self.pairs.items() if name in pair),
+            }
+            for name in self.ranking()
+        ]
+
+    def pair_report(self):
+        report = []
+        for (a, b), stats in self.pairs.items():
+            row = {'strategy': a, 'opponent': b, 'decided': self.decided((a, b))}
+            row.update(stats.as_dict(self.confidence))
+            row['score_interval'] = stats.score_interval(self.confidence)
+            row['elo_difference'] = score_to_elo(stats.score) if stats.matches else 0.0
+            report.append(row)
+        return report
+
+
+class TournamentPool:
+    """ProcessPoolExecutor of head-to-head workers for supervisor.supervise."""
+
+    def __init__(self, profile, env_name, workers):
+        self.profile = profile
+        self.env_name = env_name
+        self.workers = workers
+        self.executor = None
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                            initargs=(self.profile, self.env_name))
+        return self.executor
+
+    def stop(self, kill=False):
+        if self.executor is not None:
+            if kill:
+                kill_pool(self.executor)
+            else:
+                self.executor.shutdown()
+            self.executor = None
+
+
+def schedule(tournament, max_matches, first_seed=0, **match_options):
+    """Task stream for supervise: one head-to-head match per free worker, chosen adaptively."""
+    for number in range(max_matches):
+        pairing = tournament.next_pairing()
+        while pairing is None:
+            # Nothing to play until results of the matches in flight are in
+            if not any(tournament.in_flight.values()):
+                return
+            yield None
+            pairing = tournament.next_pairing()
+        left, right = pairing
+        tournament.start(left, right)
+        seed = first_seed + number
+        key = {'left': left, 'right': right, 'seed': seed}
+        yield key, partial(run_match, left, seed=seed, opponent=right, **match_options)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rank strategies by playing them against each other.")
+    parser.add_argument('strategies', nargs='*', default=['roles_6_11', 'roles_6_10'],
+                        help="registered names (strategies.registry.STRATEGIES) or strategy specs")
+    parser.add_argument('--max-matches', type=int, default=100, help="total match budget")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--profile', default='head_to_head',
+                        choices=sorted(profile for profile in ENV_PROFILES if controls_both_teams(profile)),
+                        help="environment profile giving agents both teams")
+    parser.add_argument('--env-name', default=None, help="scenario overriding the profile's env_name")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level of the pair intervals")
+    parser.add_argument('--precision', type=float, default=0.05,
+                        help="a pair whose score interval half-width drops below this counts as even")
+    parser.add_argument('--min-matches', type=int, default=4, help="matches every pair plays before it can be decided")
+    parser.add_argument('--first-seed', type=int, default=0, help="engine seed of the first match")
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help="fail a match that is not over after this many steps")
+    parser.add_argument('--retries', type=int, default=1, help="extra attempts for a failed match")
+    parser.add_argument('--output', default='tournament.json', help="path of the JSON report")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if len(args.strategies) < 2:
+        raise SystemExit("a tournament needs at least two strategies")
+    logging.getLogger('gfootball').setLevel(logging.WARNING)
+    for name in args.strategies:
+        load_strategy(name)
+
+    start = time.perf_counter()
+    workers = args.workers or os.cpu_count()
+    tournament = Tournament(args.strategies, args.confidence, args.precision, args.min_matches)
+    tasks = schedule(tournament, args.max_matches, args.first_seed, max_steps=args.max_steps)
+    results = []
+    for key, result, error, attempts in supervise(tasks, TournamentPool(args.profile, args.env_name, workers),
+                                                  workers, args.retries, permanent=(StepLimitExceeded,)):
+        if error is not None:
+            tournament.cancel(key['left'], key['right'])
+            results.append(dict(key, failed=True, error=error, attempts=attempts))
+            print(f"{key['left']} vs {key['right']} (seed {key['seed']}): failed: {error}", flush=True)
+            continue
+        tournament.record(key['left'], key['right'], result['left_reward'], result['right_reward'])
+        results.append(dict(key, **result, attempts=attempts))
+        print(f"{key['left']} {result['left_reward']}:{result['right_reward']} {key['right']} "
+              f"(seed {key['seed']}, {result['duration']:.1f}s)", flush=True)
+
+    report = {
+        'config': vars(args),
+        'standings': tournament.standings(),
+        'pairs': tournament.pair_report(),
+        'matches': len(results),
+        'wall_time': time.perf_counter() - start,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for rank, row in enumerate(report['standings'], 1):
+        print(f"{rank}. {row['strategy']}: {row['rating']:.0f} ({row['matches']} matches)")
+    return report
+
+
+if __name__ == '__main__':
+    main()
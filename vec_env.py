@@ -0,0 +1,135 @@
+import multiprocessing as mp
+
+from env_setup import seed_env
+
+
+class EnvWorkerError(Exception):
+    """The engine of a SubprocVectorEnv child raised; the child has exited."""
+
+
+class LocalVectorEnv:
+    """K environments stepped together in the current process.
+
+    Every method takes an optional list of env `indices` so that matches that
+    already finished can be left out; results come back in the same order.
+    """
+
+    def __init__(self, env_fns):
+        self.envs = [env_fn() for env_fn in env_fns]
+        self._pending = {}
+
+    @property
+    def num_envs(self):
+        return len(self.envs)
+
+    def _indices(self, indices):
+        return range(self.num_envs) if indices is None else indices
+
+    def seed(self, seeds, indices=None):
+        """Seeds the engines for their next reset()."""
+        for i, seed in zip(self._indices(indices), seeds):
+            seed_env(self.envs[i], seed)
+
+    def reset(self, indices=None):
+        return [self.envs[i].reset() for i in self._indices(indices)]
+
+    def step_async(self, actions, indices=None):
+        for i, action in zip(self._indices(indices), actions):
+            self._pending[i] = action
+
+    def step_wait(self, indices=None):
+        """(observations, rewards, done, info) for each env, in `indices` order."""
+        return [self.envs[i].step(self._pending.pop(i)) for i in self._indices(indices)]
+
+    def step(self, actions, indices=None):
+        self.step_async(actions, indices)
+        return self.step_wait(indices)
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+def _subprocess_worker(remote, parent_remote, env_fn):
+    parent_remote.close()
+    env = env_fn()
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == 'step':
+                remote.send(env.step(data))
+            elif command == 'reset':
+                remote.send(env.reset())
+            elif command == 'seed':
+                seed_env(env, data)
+            elif command == 'close':
+                break
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception as error:
+        # The parent gets the engine's error instead of a bare EOFError; the env is not trusted any more
+        remote.send(EnvWorkerError(f'{type(error).__name__}: {error}'))
+    finally:
+        env.close()
+        remote.close()
+
+
+class SubprocVectorEnv(LocalVectorEnv):
+    """Same interface as LocalVectorEnv with each environment in its own process.
+
+    step_async sends the actions and returns immediately, so the caller can
+    compute something else while the engines run; step_wait collects them.
+    `env_fns` must be picklable (e.g. functools.partial of create_football_env).
+    An engine exception in a child is raised by reset/step_wait as
+    EnvWorkerError and ends that child, so the vector env has to be rebuilt.
+    """
+
+    def __init__(self, env_fns):
+        context = mp.get_context('spawn')
+        self.remotes, self.work_remotes = zip(*[context.Pipe() for _ in env_fns])
+        self.processes = []
+        for work_remote, remote, env_fn in zip(self.work_remotes, self.remotes, env_fns):
+            process = context.Process(target=_subprocess_worker, args=(work_remote, remote, env_fn), daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+        self.closed = False
+
+    @property
+    def num_envs(self):
+        return len(self.remotes)
+
+    def seed(self, seeds, indices=None):
+        for i, seed in zip(self._indices(indices), seeds):
+            self.remotes[i].send(('seed', seed))
+
+    def reset(self, indices=None):
+        indices = list(self._indices(indices))
+        for i in indices:
+            self.remotes[i].send(('reset', None))
+        return [self._recv(i) for i in indices]
+
+    def _recv(self, i):
+        result = self.remotes[i].recv()
+        if isinstance(result, EnvWorkerError):
+            raise result
+        return result
+
+    def step_async(self, actions, indices=None):
+        for i, action in zip(self._indices(indices), actions):
+            self.remotes[i].send(('step', action))
+
+    def step_wait(self, indices=None):
+        return [self._recv(i) for i in self._indices(indices)]
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            try:
+                remote.send(('close', None))
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+        self.closed = True
@@ -1,48 +1,259 @@
 import numpy as np
-import gfootball.env as football_env
+
+from geometry import TeamGeometry
+from passing import PassEvaluator
+from step_caches import step_cache
+
+# Per-team observation keys, stored as one contiguous array each in TeamFrame
+TEAM_FIELDS = (
+    'team',
+    'team_direction',
+    'team_tired_factor',
+    'team_yellow_card',
+    'team_active',
+    'team_roles',
+)
+LEFT_TEAM_FIELDS = tuple('left_' + field for field in TEAM_FIELDS)
+RIGHT_TEAM_FIELDS = tuple('right_' + field for field in TEAM_FIELDS)
+
+# Match-level observation keys, identical for every controlled player
+MATCH_FIELDS = (
+    'ball',
+    'ball_direction',
+    'ball_owned_team',
+    'ball_owned_player',
+    'game_mode',
+    'score',
+    'steps_left',
+)
+
+# Keys that differ between controlled players, stacked along the first axis
+AGENT_FIELDS = (
+    'active',
+    'sticky_actions',
+)
+
+FRAME_FIELDS = LEFT_TEAM_FIELDS + RIGHT_TEAM_FIELDS + MATCH_FIELDS + AGENT_FIELDS
+
+# Rotating the pitch by 180 degrees negates x and y but not the ball height
+_BALL_ROTATION = np.array([-1.0, -1.0, 1.0])
+
+_FIELD_DTYPES = {
+    'team': np.float64,
+    'team_direction': np.float64,
+    'team_tired_factor': np.float64,
+    'team_yellow_card': np.bool_,
+    'team_active': np.bool_,
+    'team_roles': np.int64,
+}
+
+
+class TeamFrame:
+    """Struct-of-arrays snapshot of one step, shared by all controlled players.
+
+    Every field is named after the raw observation key it comes from. Team and
+    ball state is read once from the first observation; `active` and
+    `sticky_actions` are stacked per controlled player (agent index).
+    """
+    __slots__ = FRAME_FIELDS
+
+    def __init__(self, **fields):
+        for name in FRAME_FIELDS:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_observations(cls, observations):
+        shared = observations[0]
+        fields = {}
+        for side in ('left_', 'right_'):
+            for field in TEAM_FIELDS:
+                fields[side + field] = np.ascontiguousarray(shared[side + field], dtype=_FIELD_DTYPES[field])
+        fields['ball'] = np.asarray(shared['ball'], dtype=np.float64)
+        fields['ball_direction'] = np.asarray(shared['ball_direction'], dtype=np.float64)
+        fields['ball_owned_team'] = int(shared['ball_owned_team'])
+        fields['ball_owned_player'] = int(shared['ball_owned_player'])
+        fields['game_mode'] = int(shared['game_mode'])
+        fields['score'] = shared['score']
+        fields['steps_left'] = int(shared['steps_left'])
+        fields['active'] = np.array([obs['active'] for obs in observations], dtype=np.int64)
+        fields['sticky_actions'] = np.array([obs['sticky_actions'] for obs in observations], dtype=np.uint8)
+        return cls(**fields)
+
+    @property
+    def num_agents(self):
+        return len(self.active)
+
+    def mirrored(self, active, sticky_actions):
+        """The same step seen by the other team's agents, as if they attacked towards x = 1.
+
+        Positions and directions are rotated by 180 degrees and teams, score
+        and ball ownership swapped, like gfootball does for agent-controlled
+        right team players. `active` and `sticky_actions` are those of the
+        other team's agents, taken from their own observations.
+        """
+        fields = {}
+        for field in TEAM_FIELDS:
+            left, right = getattr(self, 'left_' + field), getattr(self, 'right_' + field)
+            if field in ('team', 'team_direction'):
+                left, right = -left, -right
+            fields['left_' + field] = right
+            fields['right_' + field] = left
+        fields['ball'] = self.ball * _BALL_ROTATION
+        fields['ball_direction'] = self.ball_direction * _BALL_ROTATION
+        fields['ball_owned_team'] = 1 - self.ball_owned_team if self.ball_owned_team > -1 else -1
+        fields['ball_owned_player'] = self.ball_owned_player
+        fields['game_mode'] = self.game_mode
+        fields['score'] = [self.score[1], self.score[0]]
+        fields['steps_left'] = self.steps_left
+        fields['active'] = np.asarray(active, dtype=np.int64)
+        fields['sticky_actions'] = np.asarray(sticky_actions, dtype=np.uint8)
+        return TeamFrame(**fields)
+
+    def observation(self, agent):
+        """Raw-style observation dict for one agent; arrays are views into the frame."""
+        observation = {name: getattr(self, name) for name in LEFT_TEAM_FIELDS + RIGHT_TEAM_FIELDS + MATCH_FIELDS}
+        observation['active'] = int(self.active[agent])
+        observation['sticky_actions'] = self.sticky_actions[agent]
+        return observation
+
+
+NUM_ROLES = 10
+
+
+class RoleIndex:
+    """Active players of one team grouped by role, built once per step.
+
+    `masks[role]` is a boolean mask over the team's players and
+    `indices[role]` the matching player indices, both excluding inactive
+    (red-carded) players.
+    """
+    __slots__ = ('masks', 'indices')
+
+    def __init__(self, roles, active):
+        self.masks = (roles[np.newaxis, :] == np.arange(NUM_ROLES)[:, np.newaxis]) & active
+        self.indices = [np.flatnonzero(mask) for mask in self.masks]
+
+    def players(self, role):
+        return self.indices[role]
+
+    def first(self, role):
+        """Index of the first active player with this role, or -1."""
+        players = self.indices[role]
+        return int(players[0]) if len(players) else -1
+
+    def mask(self, roles):
+        """Mask of active players holding any of the given roles."""
+        return self.masks[list(roles)].any(axis=0)
+
 
 class PlayerObservationWrapper:
-    def __init__(self, observation, wrapper):
+    """Lightweight view of one controlled player that indexes into the shared TeamFrame."""
+    __slots__ = ('wrapper', '_observation', 'index')
+
+    def __init__(self, observation, wrapper, index):
         self.wrapper = wrapper
-        self.observation = observation
-
-        # Ball information
-        self.ball_position = observation['ball'][:2]  # x, y position of the ball
-        self.ball_direction = observation['ball_direction'][:2]  # x, y direction of the ball
-        self.ball_owned_team = observation['ball_owned_team']
-        self.ball_owned_player = observation['ball_owned_player']
-
-        # Player information
-        self.active_player = observation['active']  # Index of the controlled player
-        self.player_position = observation['left_team'][self.active_player]
-        self.player_direction = observation['left_team_direction'][self.active_player]
-        self.player_tired_factor = observation['left_team_tired_factor'][self.active_player]
-        self.player_yellow_card = observation['left_team_yellow_card'][self.active_player]
-        self.player_active = observation['left_team_active'][self.active_player]
-        self.player_role = observation['left_team_roles'][self.active_player]
-
-        # Team information
-        self.left_team_positions = observation['left_team']
-        self.left_team_directions = observation['left_team_direction']
-        self.right_team_positions = observation['right_team']
-        self.right_team_directions = observation['right_team_direction']
-
-        # Game state
-        self.game_mode = observation['game_mode']
-        self.score = observation['score']
-        self.steps_left = observation['steps_left']
-        self.sticky_actions = observation['sticky_actions']
-
-        # Precomputed distances
-        self.distance_to_ball = self.compute_distance(self.player_position, self.ball_position)
-        self.distances_to_teammates = [
-            self.compute_distance(self.player_position, teammate_pos)
-            for i, teammate_pos in enumerate(self.left_team_positions) if i != self.active_player
-        ]
-        self.distances_to_opponents = [
-            self.compute_distance(self.player_position, opponent_pos)
-            for opponent_pos in self.right_team_positions
-        ]
+        self._observation = observation
+        self.index = index  # Agent index into the frame's per-agent arrays
+
+    @property
+    def observation(self):
+        # Raw dict access for older role code; rebuilt from the frame when wrapped from shared memory
+        if self._observation is None:
+            self._observation = self.wrapper.frame.observation(self.index)
+        return self._observation
+
+    # Ball information
+    @property
+    def ball_position(self):
+        return self.wrapper.frame.ball[:2]  # x, y position of the ball
+
+    @property
+    def ball_direction(self):
+        return self.wrapper.frame.ball_direction[:2]  # x, y direction of the ball
+
+    @property
+    def ball_owned_team(self):
+        return self.wrapper.frame.ball_owned_team
+
+    @property
+    def ball_owned_player(self):
+        return self.wrapper.frame.ball_owned_player
+
+    # Player information
+    @property
+    def active_player(self):
+        return int(self.wrapper.frame.active[self.index])  # Index of the controlled player
+
+    @property
+    def player_position(self):
+        return self.wrapper.frame.left_team[self.active_player]
+
+    @property
+    def player_direction(self):
+        return self.wrapper.frame.left_team_direction[self.active_player]
+
+    @property
+    def player_tired_factor(self):
+        return self.wrapper.frame.left_team_tired_factor[self.active_player]
+
+    @property
+    def player_yellow_card(self):
+        return self.wrapper.frame.left_team_yellow_card[self.active_player]
+
+    @property
+    def player_active(self):
+        return self.wrapper.frame.left_team_active[self.active_player]
+
+    @property
+    def player_role(self):
+        return self.wrapper.frame.left_team_roles[self.active_player]
+
+    # Team information
+    @property
+    def left_team_positions(self):
+        return self.wrapper.frame.left_team
+
+    @property
+    def left_team_directions(self):
+        return self.wrapper.frame.left_team_direction
+
+    @property
+    def right_team_positions(self):
+        return self.wrapper.frame.right_team
+
+    @property
+    def right_team_directions(self):
+        return self.wrapper.frame.right_team_direction
+
+    # Game state
+    @property
+    def game_mode(self):
+        return self.wrapper.frame.game_mode
+
+    @property
+    def score(self):
+        return self.wrapper.frame.score
+
+    @property
+    def steps_left(self):
+        return self.wrapper.frame.steps_left
+
+    @property
+    def sticky_actions(self):
+        return self.wrapper.frame.sticky_actions[self.index]
+
+    # Distances, read from the per-step geometry cache
+    @property
+    def distance_to_ball(self):
+        return self.wrapper.geometry.ball_distances[self.active_player]
+
+    @property
+    def distances_to_teammates(self):
+        return np.delete(self.wrapper.geometry.left_to_left[self.active_player], self.active_player)
+
+    @property
+    def distances_to_opponents(self):
+        return self.wrapper.geometry.left_to_right[self.active_player]
 
     @staticmethod
     def compute_distance(a, b):
@@ -60,7 +271,47 @@ class PlayerObservationWrapper:
 
 class ObservationWrapper:
     def __init__(self, observations):
-        self.player_observations = [PlayerObservationWrapper(obs, self) for obs in observations]
+        self.frame = TeamFrame.from_observations(observations)
+        self.player_observations = [PlayerObservationWrapper(obs, self, i) for i, obs in enumerate(observations)]
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Wraps an existing TeamFrame (e.g. a shared-memory slot) without copying it."""
+        wrapper = cls.__new__(cls)
+        wrapper.frame = frame
+        wrapper.player_observations = [PlayerObservationWrapper(None, wrapper, i) for i in range(frame.num_agents)]
+        return wrapper
+
+    @step_cache
+    def geometry(self):
+        # Built on first use and shared by every role function for this step
+        return TeamGeometry(self.frame)
+
+    @step_cache
+    def pass_evaluator(self):
+        return PassEvaluator(self.frame, self.geometry)
+
+    @step_cache
+    def left_roles(self):
+        return RoleIndex(self.frame.left_team_roles, self.frame.left_team_active)
+
+    @step_cache
+    def right_roles(self):
+        return RoleIndex(self.frame.right_team_roles, self.frame.right_team_active)
+
+    @step_cache
+    def agent_by_player(self):
+        """Maps a left team player index to the agent controlling it (-1 if none)."""
+        agents = np.full(len(self.frame.left_team), -1, dtype=np.int64)
+        agents[self.frame.active] = np.arange(len(self.frame.active))
+        return agents
+
+    def player_with_role(self, role):
+        """Observation of the first active teammate with the given role, or None."""
+        player = self.left_roles.first(role)
+        if player == -1 or self.agent_by_player[player] == -1:
+            return None
+        return self.player_observations[self.agent_by_player[player]]
 
 
 class ActionWrapper:
@@ -71,4 +322,4 @@ class ActionWrapper:
         return self.env.step(actions)
 
     def write_dump(self):
-        self.env.write_dump('shutdown')
\ No newline at end of file
+        self.env.write_dump('shutdown')